@@ -3,53 +3,212 @@ Flask web application for Greek New Testament Bible Study.
 Provides linguistic syntax querying capabilities.
 """
 
-from flask import Flask, render_template, request, jsonify
+from flask import Flask, render_template, request, jsonify, g, Response, stream_with_context
+from flask.json.provider import JSONProvider
+import orjson
 import sqlite3
-from typing import List, Dict, Any
+import queue
+import functools
+import gzip
+import hashlib
+import itertools
+from typing import List, Dict, Any, Tuple
 from collections import defaultdict
 import os
+import zlib
 from query_parser import parse_query, execute_query, format_search_help
-from relative_search import parse_verse_reference, get_verse_words, search_by_lemmas, get_verse_context
+from migrate_database import MORPH_CATEGORIES, MORPH_OPTIONS_SELECT
+from relative_search import parse_verse_reference, get_verse_words, search_by_lemmas
 from inference_search import get_verse_pattern, search_by_pattern
 from inference_search import get_verse_text as get_verse_text_with_corpus
 
+
+class ORJSONProvider(JSONProvider):
+    """JSON provider backed by orjson, which is much faster on large result sets."""
+
+    def dumps(self, obj, **kwargs):
+        return orjson.dumps(obj).decode("utf-8")
+
+    def loads(self, s, **kwargs):
+        return orjson.loads(s)
+
+    def response(self, *args, **kwargs):
+        # orjson produces bytes, so skip the str round trip done by the base class
+        obj = self._prepare_response_obj(args, kwargs)
+        return self._app.response_class(orjson.dumps(obj), mimetype="application/json")
+
+
 app = Flask(__name__)
+app.json = ORJSONProvider(app)
 DATABASE = "greek_nt.db"
 
+# Number of pre-opened connections kept for reuse (one per worker thread)
+POOL_SIZE = 8
+
+# Applied once when a pooled connection is opened. The app only reads, so WAL
+# lets readers run concurrently and the larger cache/mmap keep hot pages resident.
+CONNECTION_PRAGMAS = """
+    PRAGMA journal_mode=WAL;
+    PRAGMA synchronous=NORMAL;
+    PRAGMA temp_store=memory;
+    PRAGMA cache_size=-64000;
+    PRAGMA mmap_size=268435456;
+"""
 
-def get_db():
-    """Get database connection."""
-    conn = sqlite3.connect(DATABASE)
+_db_pool = queue.Queue(maxsize=POOL_SIZE)
+
+
+def _open_db():
+    """Open and configure a new database connection for the pool."""
+    conn = sqlite3.connect(DATABASE, check_same_thread=False, isolation_level=None,
+                           cached_statements=256)
     conn.row_factory = sqlite3.Row
+    conn.executescript(CONNECTION_PRAGMAS)
     return conn
 
 
+def get_db():
+    """Get the database connection for the current request (taken from the pool)."""
+    if "db" not in g:
+        try:
+            g.db = _db_pool.get_nowait()
+        except queue.Empty:
+            g.db = _open_db()
+    return g.db
+
+
+@app.teardown_appcontext
+def release_db(exception=None):
+    """
+    Return the request's connection to the pool.
+    Runs on every exit path (early returns, errors, finished streams), so
+    handlers never close connections themselves. A connection left inside a
+    transaction is rolled back first; one that can't be is dropped.
+    """
+    conn = g.pop("db", None)
+    if conn is None:
+        return
+    try:
+        if conn.in_transaction:
+            conn.rollback()
+        _db_pool.put_nowait(conn)
+    except (sqlite3.Error, queue.Full):
+        conn.close()
+
+
+# book_code -> abbreviation / full name. The books table never changes while
+# the app is running, so it is read once on first use instead of per result row.
+BOOK_ABBREV: Dict[str, str] = {}
+BOOK_NAME: Dict[str, str] = {}
+
+
+def load_books():
+    """Populate BOOK_ABBREV and BOOK_NAME from the books table if not done yet."""
+    if BOOK_ABBREV:
+        return
+    # Filled locally and published with one update each, BOOK_ABBREV last, so a
+    # concurrent request never sees the guard set while the dicts are partial
+    names, abbrevs = {}, {}
+    for row in get_db().execute("SELECT book_code, book_name, book_abbrev FROM books"):
+        names[row["book_code"]] = row["book_name"]
+        abbrevs[row["book_code"]] = row["book_abbrev"]
+    BOOK_NAME.update(names)
+    BOOK_ABBREV.update(abbrevs)
+
+
+def get_book_name(book_code: str) -> str:
+    """Get the full name of a book."""
+    load_books()
+    return BOOK_NAME.get(book_code, f"Book {book_code}")
+
+
 def format_reference(book_code: str, chapter: int, verse: int) -> str:
     """Format a verse reference."""
-    conn = get_db()
-    cursor = conn.cursor()
-    cursor.execute("SELECT book_abbrev FROM books WHERE book_code = ?", (book_code,))
-    result = cursor.fetchone()
-    conn.close()
+    load_books()
+    return f"{BOOK_ABBREV.get(book_code, book_code)} {chapter}:{verse}"
+
+
+# Verses per batch in get_verse_texts (3 bound parameters each, kept under
+# SQLite's default limit of 999 host parameters)
+VERSE_BATCH_SIZE = 300
+
+
+def get_verse_texts(conn, verse_keys) -> Dict[Tuple[str, int, int], str]:
+    """
+    Get the full Greek text of many verses at once.
+    Takes an iterable of (book_code, chapter, verse) keys and returns a dict
+    mapping each key to its text.
+    """
+    verse_keys = list(dict.fromkeys(verse_keys))
+    verse_words = defaultdict(list)
     
-    if result:
-        return f"{result['book_abbrev']} {chapter}:{verse}"
-    return f"{book_code} {chapter}:{verse}"
+    for start in range(0, len(verse_keys), VERSE_BATCH_SIZE):
+        batch = verse_keys[start:start + VERSE_BATCH_SIZE]
+        values = ",".join("(?, ?, ?)" for _ in batch)
+        params = [value for key in batch for value in key]
+        # CROSS JOIN keeps the key list as the outer loop so each verse is an index lookup
+        cursor = conn.execute(f"""
+            WITH keys(book_code, chapter, verse) AS (VALUES {values})
+            SELECT w.book_code, w.chapter, w.verse, w.word
+            FROM keys CROSS JOIN words w
+                ON w.book_code = keys.book_code AND w.chapter = keys.chapter AND w.verse = keys.verse
+            ORDER BY w.book_code, w.chapter, w.verse, w.word_position
+        """, params)
+        for book_code, chapter, verse, word in cursor:
+            verse_words[(book_code, chapter, verse)].append(word)
+    
+    return {key: " ".join(verse_words[key]) for key in verse_keys}
 
 
-def get_verse_text(book_code: str, chapter: int, verse: int) -> str:
-    """Get the full Greek text of a verse."""
-    conn = get_db()
-    cursor = conn.cursor()
-    cursor.execute("""
-        SELECT word FROM words
-        WHERE book_code = ? AND chapter = ? AND verse = ?
-        ORDER BY word_position
-    """, (book_code, chapter, verse))
+# Rows formatted and written per chunk when streaming search results
+STREAM_BATCH_SIZE = 64
+
+
+def stream_results(conn, rows, to_result, limit: int = 500, page_key=None, **extra) -> Response:
+    """
+    Stream a search response as JSON while rows are read from SQLite.
+    
+    to_result turns a row into a (verse_key, result) pair. Rows are handled in
+    batches of STREAM_BATCH_SIZE: each batch gets its verse texts in one lookup
+    and is written as a single chunk. The count, the limited flag and any extra
+    fields follow the results array. If page_key is given, a full page also
+    gets a next_cursor built from page_key(last row).
+    """
+    rows = iter(rows)
+    
+    def generate():
+        yield b'{"results":['
+        count = 0
+        seen_verses = set()
+        last_row = None
+        
+        while True:
+            batch_rows = list(itertools.islice(rows, STREAM_BATCH_SIZE))
+            if not batch_rows:
+                break
+            last_row = batch_rows[-1]
+            batch = [to_result(row) for row in batch_rows]
+            
+            verse_texts = get_verse_texts(conn, (key for key, _ in batch if key not in seen_verses))
+            chunk = []
+            for verse_key, result in batch:
+                # Add full verse text if we haven't seen this verse yet
+                if verse_key not in seen_verses:
+                    result["verse_text"] = verse_texts[verse_key]
+                    seen_verses.add(verse_key)
+                chunk.append(orjson.dumps(result))
+            
+            yield (b"," if count else b"") + b",".join(chunk)
+            count += len(batch)
+        
+        if page_key is not None:
+            extra["next_cursor"] = page_key(last_row) if count >= limit else None
+        
+        # Close the array and splice the trailing fields into the same object
+        tail = orjson.dumps({"count": count, "limited": count >= limit, **extra})
+        yield b"]," + tail[1:]
     
-    words = [row["word"] for row in cursor.fetchall()]
-    conn.close()
-    return " ".join(words)
+    return Response(stream_with_context(generate()), mimetype="application/json")
 
 
 @app.route("/")
@@ -58,15 +217,143 @@ def index():
     return render_template("index.html")
 
 
-@app.route("/api/books")
-def get_books():
-    """Get list of all books."""
+def cached_json(payload: bytes) -> Response:
+    """
+    Build a JSON response for a payload that only depends on static DB contents.
+    Clients may cache it for an hour and revalidate with the ETag.
+    """
+    response = Response(payload, mimetype="application/json")
+    response.set_etag(hashlib.blake2b(payload, digest_size=8).hexdigest())
+    response.cache_control.public = True
+    response.cache_control.max_age = 3600
+    return response.make_conditional(request)
+
+
+# gzip settings for JSON responses. Level 4 gets most of the size reduction on
+# the repetitive result payloads for a fraction of the CPU of level 9.
+COMPRESS_LEVEL = 4
+COMPRESS_MIN_SIZE = 500
+
+
+def _gzip_stream(chunks):
+    """gzip a streamed body, flushing after each chunk so rows still go out as they are produced."""
+    compressor = zlib.compressobj(COMPRESS_LEVEL, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+    try:
+        for chunk in chunks:
+            yield compressor.compress(chunk) + compressor.flush(zlib.Z_SYNC_FLUSH)
+        yield compressor.flush()
+    finally:
+        # Closing the wrapped stream ends its request context if the client goes away early
+        if hasattr(chunks, "close"):
+            chunks.close()
+
+
+@app.after_request
+def compress_response(response):
+    """gzip JSON responses for clients that accept it."""
+    if (
+        response.mimetype != "application/json"
+        or response.status_code != 200
+        or "Content-Encoding" in response.headers
+        or response.get_etag()[0]  # cached_json payloads are small and revalidated by ETag
+        or "gzip" not in request.accept_encodings
+    ):
+        return response
+    
+    if response.is_streamed:
+        response.response = _gzip_stream(response.response)
+        response.headers.pop("Content-Length", None)
+    else:
+        body = response.get_data()
+        if len(body) < COMPRESS_MIN_SIZE:
+            return response
+        response.set_data(gzip.compress(body, COMPRESS_LEVEL))
+    
+    response.headers["Content-Encoding"] = "gzip"
+    response.vary.add("Accept-Encoding")
+    return response
+
+
+@functools.lru_cache(maxsize=1)
+def books_payload() -> bytes:
+    """Serialized list of all books."""
     conn = get_db()
     cursor = conn.cursor()
     cursor.execute("SELECT book_code, book_name, book_abbrev FROM books ORDER BY book_code")
     books = [dict(row) for row in cursor.fetchall()]
-    conn.close()
-    return jsonify(books)
+    return orjson.dumps(books)
+
+
+@app.route("/api/books")
+def get_books():
+    """Get list of all books."""
+    return cached_json(books_payload())
+
+
+# /api/search request fields and the condition each one adds, in the order applied
+SEARCH_FILTERS = [
+    ("book", "w.book_code = ?"),
+    ("lemma", "w.lemma = ?"),  # Lemma search (exact)
+    ("pos", "w.pos = ?"),
+    ("person", "w.person = ?"),
+    ("tense", "w.tense = ?"),
+    ("mood", "w.mood = ?"),
+    ("voice", "w.voice = ?"),
+    ("case", "w.case_value = ?"),
+    ("gender", "w.gender = ?"),
+    ("number", "w.number = ?"),
+    ("text", "(w.word LIKE ? OR w.lemma LIKE ?)"),  # Text search (word or lemma), unindexable so last
+]
+SEARCH_CONDITIONS = dict(SEARCH_FILTERS)
+# Text search through the trigram full-text index, used in place of "text" when possible
+SEARCH_CONDITIONS["fts"] = "w.id IN (SELECT rowid FROM words_fts WHERE words_fts MATCH ?)"
+
+# The trigram index can only match terms of at least this many characters
+FTS_MIN_LENGTH = 3
+
+
+@functools.lru_cache(maxsize=1)
+def fts_available() -> bool:
+    """Whether words_fts is the trigram index created by migrate_database."""
+    row = get_db().execute("SELECT sql FROM sqlite_master WHERE name = 'words_fts'").fetchone()
+    return row is not None and "trigram" in row["sql"]
+
+# Result keys for the leading columns of a search row (the last column is book_abbrev)
+SEARCH_RESULT_KEYS = (
+    "book_code", "chapter", "verse", "word", "lemma", "morph_code",
+    "pos", "tense", "voice", "mood", "case", "number", "gender", "word_position",
+)
+
+# Position of word_position in a search row, for building the next-page cursor
+SEARCH_POSITION_COLUMN = SEARCH_RESULT_KEYS.index("word_position")
+
+
+@functools.lru_cache(maxsize=256)
+def build_search_sql(fields: Tuple[str, ...], paged: bool = False) -> str:
+    """
+    Build the /api/search SQL for a combination of filter fields.
+    The same combination always yields the identical string, so sqlite3's
+    statement cache can reuse the prepared statement.
+    
+    A paged query continues after an (book_code, chapter, verse, word_position)
+    cursor. The cursor follows the ORDER BY key, so each page starts with an
+    index seek instead of re-reading the earlier pages.
+    """
+    # The book abbreviation comes back with each row so no per-row lookup is needed.
+    query = f"""
+        SELECT w.book_code, w.chapter, w.verse, w.word, w.lemma, w.morph_code,
+               w.pos, w.tense, w.voice, w.mood, w.case_value, w.number, w.gender,
+               w.word_position, b.book_abbrev
+        FROM words w
+        LEFT JOIN books b ON b.book_code = w.book_code
+        WHERE 1=1"""
+    for field in fields:
+        query += f" AND {SEARCH_CONDITIONS[field]}"
+    if paged:
+        query += " AND (w.book_code, w.chapter, w.verse, w.word_position) > (?, ?, ?, ?)"
+    
+    # Add ordering and limit
+    return query + " ORDER BY w.book_code, w.chapter, w.verse, w.word_position LIMIT 500"
 
 
 @app.route("/api/search", methods=["POST"])
@@ -78,114 +365,54 @@ def search():
     data = request.json
     
     # Build query dynamically based on provided criteria
-    query = "SELECT DISTINCT book_code, chapter, verse, word, lemma, morph_code, pos, tense, voice, mood, case_value, number, gender FROM words WHERE 1=1"
+    fields = tuple(field for field, _ in SEARCH_FILTERS if data.get(field))
     params = []
-    
-    # Text search (word or lemma)
-    if data.get("text"):
-        query += " AND (word LIKE ? OR lemma LIKE ?)"
-        search_term = f"%{data['text']}%"
-        params.extend([search_term, search_term])
-    
-    # Lemma search (exact)
-    if data.get("lemma"):
-        query += " AND lemma = ?"
-        params.append(data["lemma"])
-    
-    # Part of speech
-    if data.get("pos"):
-        query += " AND pos = ?"
-        params.append(data["pos"])
-    
-    # Tense
-    if data.get("tense"):
-        query += " AND tense = ?"
-        params.append(data["tense"])
-    
-    # Voice
-    if data.get("voice"):
-        query += " AND voice = ?"
-        params.append(data["voice"])
-    
-    # Mood
-    if data.get("mood"):
-        query += " AND mood = ?"
-        params.append(data["mood"])
-    
-    # Case
-    if data.get("case"):
-        query += " AND case_value = ?"
-        params.append(data["case"])
-    
-    # Number
-    if data.get("number"):
-        query += " AND number = ?"
-        params.append(data["number"])
-    
-    # Gender
-    if data.get("gender"):
-        query += " AND gender = ?"
-        params.append(data["gender"])
-    
-    # Person
-    if data.get("person"):
-        query += " AND person = ?"
-        params.append(data["person"])
-    
-    # Book filter
-    if data.get("book"):
-        query += " AND book_code = ?"
-        params.append(data["book"])
-    
-    # Add ordering and limit
-    query += " ORDER BY book_code, chapter, verse LIMIT 500"
+    for field in fields:
+        if field == "text":
+            search_term = f"%{data['text']}%"
+            params.extend([search_term, search_term])
+        else:
+            params.append(data[field])
+    
+    # Long enough text terms go through the full-text index instead of LIKE (text is
+    # the last filter, so its two LIKE params are the last two).
+    # The term is quoted as one FTS5 string, which the trigram index matches as a substring.
+    text = data.get("text")
+    if text and len(text) >= FTS_MIN_LENGTH and fts_available():
+        fields = tuple("fts" if field == "text" else field for field in fields)
+        params[-2:] = ['"' + text.replace('"', '""') + '"']
+    
+    # Continue from the next_cursor of the previous page, if given
+    after = data.get("after")
+    if after is not None:
+        if not (
+            isinstance(after, list) and len(after) == 4 and isinstance(after[0], str)
+            and all(isinstance(n, int) and not isinstance(n, bool) for n in after[1:])
+        ):
+            return jsonify({"error": "after must be [book_code, chapter, verse, word_position]"}), 400
+        params.extend(after)
+    query = build_search_sql(fields, after is not None)
     
     conn = get_db()
     cursor = conn.cursor()
+    cursor.row_factory = None  # plain tuples; result dicts are zipped from SEARCH_RESULT_KEYS
     cursor.execute(query, params)
     
-    results = []
-    seen_verses = set()
-    
-    for row in cursor.fetchall():
-        verse_key = (row["book_code"], row["chapter"], row["verse"])
-        
-        result = {
-            "reference": format_reference(row["book_code"], row["chapter"], row["verse"]),
-            "book_code": row["book_code"],
-            "chapter": row["chapter"],
-            "verse": row["verse"],
-            "word": row["word"],
-            "lemma": row["lemma"],
-            "morph_code": row["morph_code"],
-            "pos": row["pos"],
-            "tense": row["tense"],
-            "voice": row["voice"],
-            "mood": row["mood"],
-            "case": row["case_value"],
-            "number": row["number"],
-            "gender": row["gender"],
-        }
-        
-        # Add full verse text if we haven't seen this verse yet
-        if verse_key not in seen_verses:
-            result["verse_text"] = get_verse_text(row["book_code"], row["chapter"], row["verse"])
-            seen_verses.add(verse_key)
-        
-        results.append(result)
-    
-    conn.close()
+    def to_result(row):
+        book_code, chapter, verse = row[:3]
+        result = {"reference": f"{row[-1] or book_code} {chapter}:{verse}"}
+        result.update(zip(SEARCH_RESULT_KEYS, row))
+        return row[:3], result
     
-    return jsonify({
-        "results": results,
-        "count": len(results),
-        "limited": len(results) >= 500
-    })
+    def page_key(row):
+        return [*row[:3], row[SEARCH_POSITION_COLUMN]]
+    
+    return stream_results(conn, cursor, to_result, page_key=page_key)
 
 
-@app.route("/api/stats")
-def get_stats():
-    """Get database statistics."""
+@functools.lru_cache(maxsize=1)
+def stats_payload() -> bytes:
+    """Serialized database statistics."""
     conn = get_db()
     cursor = conn.cursor()
     
@@ -198,33 +425,42 @@ def get_stats():
     cursor.execute("SELECT COUNT(*) as count FROM books")
     total_books = cursor.fetchone()["count"]
     
-    conn.close()
-    
-    return jsonify({
+    return orjson.dumps({
         "total_words": total_words,
         "unique_lemmas": unique_lemmas,
         "total_books": total_books
     })
 
 
-@app.route("/api/morphology/options")
-def get_morphology_options():
-    """Get available morphological options for dropdowns."""
+@app.route("/api/stats")
+def get_stats():
+    """Get database statistics."""
+    return cached_json(stats_payload())
+
+
+@functools.lru_cache(maxsize=1)
+def morphology_options_payload() -> bytes:
+    """Serialized morphological options, one list of values per category."""
     conn = get_db()
-    cursor = conn.cursor()
-    
-    options = {}
     
-    # Get unique values for each morphological category
-    categories = ["pos", "tense", "voice", "mood", "case_value", "number", "gender", "person"]
-    
-    for category in categories:
-        cursor.execute(f"SELECT DISTINCT {category} FROM words WHERE {category} IS NOT NULL ORDER BY {category}")
-        options[category.replace("_value", "")] = [row[category] for row in cursor.fetchall()]
+    # morph_options is precomputed by migrate_database; an unmigrated database
+    # gets the same rows straight from words
+    has_table = conn.execute(
+        "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'morph_options'"
+    ).fetchone()
+    source = "morph_options" if has_table else f"({MORPH_OPTIONS_SELECT})"
     
-    conn.close()
+    options = {category: [] for category in MORPH_CATEGORIES}
+    for row in conn.execute(f"SELECT category, value FROM {source} ORDER BY category, value"):
+        options[row["category"]].append(row["value"])
     
-    return jsonify(options)
+    return orjson.dumps(options)
+
+
+@app.route("/api/morphology/options")
+def get_morphology_options():
+    """Get available morphological options for dropdowns."""
+    return cached_json(morphology_options_payload())
 
 
 @app.route("/api/advanced-search", methods=["POST"])
@@ -264,39 +500,12 @@ def advanced_search():
         conn = get_db()
         results = execute_query(conn, query, corpora)
         
-        # Add verse references and full verse text
-        formatted_results = []
-        seen_verses = set()
-        
-        for result in results:
+        def to_result(result):
             verse_key = (result["book_code"], result["chapter"], result["verse"])
-            
-            # Add reference
-            result["reference"] = format_reference(
-                result["book_code"], 
-                result["chapter"], 
-                result["verse"]
-            )
-            
-            # Add full verse text if we haven't seen this verse yet
-            if verse_key not in seen_verses:
-                result["verse_text"] = get_verse_text(
-                    result["book_code"],
-                    result["chapter"],
-                    result["verse"]
-                )
-                seen_verses.add(verse_key)
-            
-            formatted_results.append(result)
-        
-        conn.close()
+            result["reference"] = format_reference(*verse_key)
+            return verse_key, result
         
-        return jsonify({
-            "results": formatted_results,
-            "count": len(formatted_results),
-            "limited": len(formatted_results) >= 500,
-            "query": str(query)
-        })
+        return stream_results(conn, results, to_result, query=str(query))
         
     except Exception as e:
         return jsonify({
@@ -306,6 +515,26 @@ def advanced_search():
         }), 400
 
 
+def _load_source_verse(conn, book_code, chapter, verse):
+    """
+    Get the corpus and full text of a relative-search source verse in one query.
+    Returns (corpus, text), or None if the verse is not in the database.
+    """
+    # Ordered subquery so GROUP_CONCAT joins the words in verse order
+    corpus, text = conn.execute("""
+        SELECT MIN(corpus), GROUP_CONCAT(word, ' ')
+        FROM (
+            SELECT corpus, word FROM words
+            WHERE book_code = ? AND chapter = ? AND verse = ?
+            ORDER BY word_position
+        )
+    """, (book_code, chapter, verse)).fetchone()
+    
+    if corpus is None:
+        return None
+    return corpus, text or ""
+
+
 def handle_relative_search(verse_reference, corpora, provided_lemmas=None, book_codes=None):
     """
     Handle a relative search request.
@@ -339,44 +568,34 @@ def handle_relative_search(verse_reference, corpora, provided_lemmas=None, book_
                 "is_relative_search": True
             }), 404
         
-        # Get the source verse text
-        source_corpus = conn.execute(
-            "SELECT corpus FROM words WHERE book_code = ? AND chapter = ? AND verse = ? LIMIT 1",
-            (book_code, chapter, verse)
-        ).fetchone()
+        # Get the source verse corpus and text
+        source = _load_source_verse(conn, book_code, chapter, verse)
         
-        if not source_corpus:
+        if not source:
             return jsonify({
                 "error": f"Verse not found: {verse_reference}",
                 "is_relative_search": True
             }), 404
         
-        source_corpus = source_corpus[0]
-        source_text = get_verse_context(conn, book_code, chapter, verse, source_corpus)
-        
-        # Get book name
-        book_name = conn.execute(
-            "SELECT book_name FROM books WHERE book_code = ? AND corpus = ?",
-            (book_code, source_corpus)
-        ).fetchone()[0]
+        source_corpus, source_text = source
+        book_name = get_book_name(book_code)
         
-        # Search for similar verses
-        results = search_by_lemmas(
+        # Search for similar verses (top 100 results)
+        results, total_matches = search_by_lemmas(
             conn,
             lemmas,
             book_code,
             chapter,
             verse,
             corpora,
-            book_codes
+            book_codes,
+            limit=100
         )
         
         # Format results with references
         for result in results:
             result["reference"] = f"{result['book_name']} {result['chapter']}:{result['verse']}"
         
-        conn.close()
-        
         # Return results with source verse info and flag
         return jsonify({
             "is_relative_search": True,
@@ -389,10 +608,10 @@ def handle_relative_search(verse_reference, corpora, provided_lemmas=None, book_
                 "corpus": source_corpus,
                 "words": lemmas  # Include all words for checkbox UI
             },
-            "results": results[:100],  # Limit to top 100 results
-            "count": len(results[:100]),
-            "total_matches": len(results),
-            "limited": len(results) > 100
+            "results": results,
+            "count": len(results),
+            "total_matches": total_matches,
+            "limited": total_matches > 100
         })
         
     except ValueError as e:
@@ -454,10 +673,7 @@ def handle_inference_search(verse_reference, corpora, book_codes=None):
         source_words = [{'word': word, 'pos': pos if pos else 'unknown'} for word, pos in source_words_data]
         
         # Get book name
-        book_name = conn.execute(
-            "SELECT book_name FROM books WHERE book_code = ? AND corpus = ?",
-            (book_code, source_corpus)
-        ).fetchone()[0]
+        book_name = get_book_name(book_code)
         
         # Search for verses with similar patterns
         results = search_by_pattern(
@@ -477,8 +693,6 @@ def handle_inference_search(verse_reference, corpora, book_codes=None):
         for result in results:
             result["reference"] = f"{result['book_name']} {result['chapter']}:{result['verse']}"
         
-        conn.close()
-        
         # Return results with source verse info and pattern
         return jsonify({
             "is_inference_search": True,
@@ -522,88 +736,19 @@ def relative_search():
     if not verse_reference:
         return jsonify({"error": "No verse reference provided"}), 400
     
-    try:
-        # Parse the verse reference
-        book_code, chapter, verse = parse_verse_reference(verse_reference)
-        
-        # Get connection
-        conn = get_db()
-        
-        # If lemmas are provided, use them (for re-search)
-        # Otherwise, get all words from the source verse
-        if provided_lemmas:
-            lemmas = provided_lemmas
-        else:
-            lemmas = get_verse_words(conn, book_code, chapter, verse)
-        
-        if not lemmas:
-            return jsonify({
-                "error": "No words found in source verse",
-                "source_verse": verse_reference
-            }), 404
-        
-        # Get the source verse text
-        source_corpus = conn.execute(
-            "SELECT corpus FROM words WHERE book_code = ? AND chapter = ? AND verse = ? LIMIT 1",
-            (book_code, chapter, verse)
-        ).fetchone()
-        
-        if not source_corpus:
-            return jsonify({
-                "error": f"Verse not found: {verse_reference}"
-            }), 404
-        
-        source_corpus = source_corpus[0]
-        source_text = get_verse_context(conn, book_code, chapter, verse, source_corpus)
-        
-        # Get book name
-        book_name = conn.execute(
-            "SELECT book_name FROM books WHERE book_code = ? AND corpus = ?",
-            (book_code, source_corpus)
-        ).fetchone()[0]
-        
-        # Search for similar verses
-        results = search_by_lemmas(
-            conn,
-            lemmas,
-            book_code,
-            chapter,
-            verse,
-            corpora
-        )
-        
-        # Format results with references
-        for result in results:
-            result["reference"] = f"{result['book_name']} {result['chapter']}:{result['verse']}"
-        
-        conn.close()
-        
-        # Return results with source verse info
-        return jsonify({
-            "source_verse": {
-                "reference": f"{book_name} {chapter}:{verse}",
-                "text": source_text,
-                "book_code": book_code,
-                "chapter": chapter,
-                "verse": verse,
-                "corpus": source_corpus,
-                "words": lemmas  # Include all words for checkbox UI
-            },
-            "results": results[:100],  # Limit to top 100 results
-            "total_matches": len(results),
-            "limited": len(results) > 100
-        })
-        
-    except ValueError as e:
-        return jsonify({"error": str(e)}), 400
-    except Exception as e:
-        return jsonify({"error": f"Search error: {str(e)}"}), 500
+    return handle_relative_search(verse_reference, corpora, provided_lemmas)
+
+
+@functools.lru_cache(maxsize=1)
+def search_help_payload() -> bytes:
+    """Serialized search syntax help."""
+    return orjson.dumps(format_search_help())
 
 
 @app.route("/api/search-help")
 def search_help():
     """Get help documentation for advanced search syntax."""
-    return jsonify(format_search_help())
+    return cached_json(search_help_payload())
 
 
 @app.route("/api/word-info")
@@ -630,7 +775,6 @@ def word_info():
     """, (word_id,)).fetchone()
 
     if not word:
-        conn.close()
         return jsonify({"error": "Word not found"}), 404
 
     # English gloss from lexicon
@@ -650,8 +794,6 @@ def word_info():
         (word["lemma"],)
     ).fetchone()["cnt"]
 
-    conn.close()
-
     return jsonify({
         "word": word["word"],
         "lemma": word["lemma"],
@@ -744,8 +886,6 @@ def read_text():
                 }
                 chapters.append(chapter_data)
         
-        conn.close()
-        
         return jsonify({
             "chapters": chapters,
             "requested_chapter": chapter,
@@ -766,6 +906,8 @@ if __name__ == "__main__":
     print("=" * 60)
     print("Server starting at http://localhost:5000")
     print("Press Ctrl+C to stop")
+    print("For production, serve app:app with gunicorn or waitress (see README)")
     print("=" * 60)
     
-    app.run(debug=True, host="0.0.0.0", port=5000)
+    # Development server; set FLASK_DEBUG=1 for the debugger and reloader
+    app.run(debug=os.environ.get("FLASK_DEBUG") == "1", host="0.0.0.0", port=5000, threaded=True)
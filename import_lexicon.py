@@ -11,6 +11,7 @@ Or it will be called automatically by setup_database.py for new installs.
 import sqlite3
 import requests
 import os
+from contextlib import closing
 
 LEXEMES_URL = "https://raw.githubusercontent.com/morphgnt/morphological-lexicon/master/lexemes.yaml"
 DATABASE = "greek_nt.db"
@@ -99,14 +100,13 @@ def main():
     print(f"  [OK] Parsed {len(entries):,} lemma entries")
     print()
 
-    conn = sqlite3.connect(DATABASE)
-    create_lexicon_table(conn)
+    with closing(sqlite3.connect(DATABASE)) as conn:
+        create_lexicon_table(conn)
 
-    print("Importing glosses into database...")
-    count = populate_lexicon(conn, entries)
-    print(f"  [OK] Imported {count:,} glosses")
+        print("Importing glosses into database...")
+        count = populate_lexicon(conn, entries)
+        print(f"  [OK] Imported {count:,} glosses")
 
-    conn.close()
     print()
     print("=" * 60)
     print("Lexicon import complete!")
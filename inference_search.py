@@ -7,6 +7,7 @@ import sqlite3
 import re
 from typing import Dict, List, Tuple, Any, Optional
 from difflib import SequenceMatcher
+from query_parser import book_key, BOOK_CODES as QUERY_BOOK_CODES
 
 # Book abbreviations to codes (from query_parser.py)
 BOOK_ABBREVIATIONS = {
@@ -40,6 +41,12 @@ BOOK_ABBREVIATIONS = {
     'rev': '27', 'revelation': '27', 're': '27',
 }
 
+# Normalized lookup for verse references, accepting the advanced-search names too
+BOOK_CODES = {
+    **QUERY_BOOK_CODES,
+    **{book_key(abbrev): code for abbrev, code in BOOK_ABBREVIATIONS.items()},
+}
+
 
 def parse_verse_reference(ref: str) -> Tuple[str, int, int]:
     """
@@ -55,10 +62,10 @@ def parse_verse_reference(ref: str) -> Tuple[str, int, int]:
         raise ValueError(f"Invalid verse reference format: {ref}")
     
     book_str, chapter_str, verse_str = match.groups()
-    book_str = book_str.lower().replace(' ', '')
+    book_str = book_key(book_str)
     
     # Look up book code
-    book_code = BOOK_ABBREVIATIONS.get(book_str)
+    book_code = BOOK_CODES.get(book_str)
     if not book_code:
         raise ValueError(f"Unknown book: {book_str}")
     
@@ -343,11 +350,14 @@ def get_verse_text(
     """Get the full text of a verse."""
     cursor = conn.cursor()
     
+    # Ordered subquery so GROUP_CONCAT joins the words in verse order
     query = """
         SELECT GROUP_CONCAT(word, ' ')
-        FROM words
-        WHERE book_code = ? AND chapter = ? AND verse = ? AND corpus = ?
-        ORDER BY word_position
+        FROM (
+            SELECT word FROM words
+            WHERE book_code = ? AND chapter = ? AND verse = ? AND corpus = ?
+            ORDER BY word_position
+        )
     """
     
     cursor.execute(query, (book_code, chapter, verse, corpus))
@@ -5,14 +5,127 @@ Extracts morphologically tagged text from SWORD module and imports into database
 
 import sqlite3
 import re
+import functools
 from typing import Dict, List, Tuple, Optional
 from pysword.modules import SwordModules
-import xml.etree.ElementTree as ET
+from migrate_database import migrate
 
 # Packard morphology code mapping
 # Format: Category-Number-Case-Number-Gender (e.g., N1-DSF)
 # Position codes vary by part of speech
 
+CASE_MAP = {'N': 'nominative', 'G': 'genitive', 'D': 'dative', 'A': 'accusative', 'V': 'vocative'}
+NUMBER_MAP = {'S': 'singular', 'P': 'plural'}
+GENDER_MAP = {'M': 'masculine', 'F': 'feminine', 'N': 'neuter'}
+TENSE_MAP = {
+    'PA': 'present', 'IA': 'imperfect', 'FA': 'future',
+    'AA': 'aorist', 'XA': 'perfect', 'YA': 'pluperfect',
+    'AI': 'aorist'  # Alternative aorist code
+}
+VOICE_MAP = {'A': 'active', 'M': 'middle', 'P': 'passive'}
+MOOD_MAP = {'I': 'indicative', 'S': 'subjunctive', 'O': 'optative',
+            'D': 'imperative', 'N': 'infinitive', 'P': 'participle'}
+PERSON_MAP = {'1': '1st', '2': '2nd', '3': '3rd'}
+
+# Simple POS codes
+SIMPLE_POS = {
+    'P': 'preposition',
+    'C': 'conjunction',
+    'D': 'adverb',
+    'T': 'particle',
+    'X': 'interjection'
+}
+
+
+def _add_case_number_gender(morph: Dict[str, str], case_code, number_code, gender_code):
+    """Fill in the case/number/gender fields shared by nouns, articles and adjectives."""
+    if case_code in CASE_MAP:
+        morph['case'] = CASE_MAP[case_code]
+    if number_code in NUMBER_MAP:
+        morph['number'] = NUMBER_MAP[number_code]
+    if gender_code in GENDER_MAP:
+        morph['gender'] = GENDER_MAP[gender_code]
+
+
+DIGITS = '0123456789'
+
+
+def _is_upper(text: str) -> bool:
+    """True if text is made only of the ASCII capitals A-Z."""
+    return all('A' <= ch <= 'Z' for ch in text)
+
+
+def _decode_nominal(morph_code: str, pos: str) -> Optional[Dict[str, str]]:
+    """Decode a noun or adjective code, X#-CSG (declension digits, then case/number/gender)."""
+    i = 1
+    while i < len(morph_code) and morph_code[i] in DIGITS:
+        i += 1
+    if i == 1 or len(morph_code) < i + 3 or morph_code[i] != '-':
+        return None
+    morph = {'pos': pos}
+    _add_case_number_gender(morph, morph_code[i + 1], morph_code[i + 2], morph_code[i + 3:])
+    return morph
+
+
+def _decode_noun(morph_code: str) -> Optional[Dict[str, str]]:
+    """Noun: N#-CSG where C=case, S=number, G=gender."""
+    return _decode_nominal(morph_code, 'noun')
+
+
+def _decode_adjective(morph_code: str) -> Optional[Dict[str, str]]:
+    """Adjective: A#-CSG, laid out like a noun."""
+    return _decode_nominal(morph_code, 'adjective')
+
+
+def _decode_verb(morph_code: str) -> Optional[Dict[str, str]]:
+    """Verb: VTT-VMX#N, tense code, then voice/mood/variant letters, person digit and number."""
+    if len(morph_code) < 7 or morph_code[3] != '-' or not _is_upper(morph_code[1:3] + morph_code[4:7]):
+        return None
+    morph = {'pos': 'verb'}
+    tense_code, voice_code, mood_code = morph_code[1:3], morph_code[4], morph_code[5]
+    
+    # Optional person digit, then an optional number code
+    rest = morph_code[7:9]
+    if rest[:1] and rest[0] in DIGITS:
+        person_code, number_code = rest[0], rest[1:]
+    else:
+        person_code, number_code = None, rest[:1]
+    
+    if tense_code in TENSE_MAP:
+        morph['tense'] = TENSE_MAP[tense_code]
+    if voice_code in VOICE_MAP:
+        morph['voice'] = VOICE_MAP[voice_code]
+    if mood_code in MOOD_MAP:
+        morph['mood'] = MOOD_MAP[mood_code]
+    if person_code in PERSON_MAP:
+        morph['person'] = PERSON_MAP[person_code]
+    if number_code in NUMBER_MAP:
+        morph['number'] = NUMBER_MAP[number_code]
+    
+    return morph
+
+
+def _decode_article(morph_code: str) -> Optional[Dict[str, str]]:
+    """Article (pRonoun-Article): RA-CSG. Any R code of 3+ characters is read this way."""
+    if len(morph_code) < 3 and not morph_code.startswith('RA'):
+        return None
+    morph = {'pos': 'pronoun'}  # Articles stored as pronouns
+    parts = morph_code.replace('RA-', '').replace('RA', '')
+    if len(parts) >= 2:
+        _add_case_number_gender(morph, parts[0], parts[1], parts[2] if len(parts) > 2 else None)
+    return morph
+
+
+# Decoder for each leading part-of-speech letter
+MORPH_DECODERS = {
+    'N': _decode_noun,
+    'V': _decode_verb,
+    'R': _decode_article,
+    'A': _decode_adjective,
+}
+
+
+@functools.lru_cache(maxsize=None)
 def parse_packard_morph(morph_code: str) -> Dict[str, str]:
     """
     Parse Packard morphology codes into database fields.
@@ -21,159 +134,36 @@ def parse_packard_morph(morph_code: str) -> Dict[str, str]:
     - N1-DSF: Noun, 1st declension, Dative, Singular, Feminine
     - VAI-AAI3S: Verb, Aorist, Active, Indicative, 3rd person, Singular
     - RA-NSM: Article (pRonoun-Article), Nominative, Singular, Masculine
-    """
-    morph = {}
     
+    The codes are fixed-position, so the leading letter picks a decoder that
+    reads the remaining fields by index. Results are cached per code (there
+    are only a few thousand distinct codes), so callers must treat the
+    returned dict as read-only.
+    """
     # Remove 'packard:' prefix if present
     if ':' in morph_code:
         morph_code = morph_code.split(':')[1]
     
-    # Noun pattern: N#-CSG where C=case, S=number, G=gender
-    noun_match = re.match(r'N(\d+)-(.)(.)(.*)', morph_code)
-    if noun_match:
-        morph['pos'] = 'noun'
-        case_code = noun_match.group(2)
-        number_code = noun_match.group(3)
-        gender_code = noun_match.group(4) if noun_match.group(4) else None
-        
-        # Case mapping
-        case_map = {'N': 'nominative', 'G': 'genitive', 'D': 'dative', 'A': 'accusative', 'V': 'vocative'}
-        if case_code in case_map:
-            morph['case'] = case_map[case_code]
-        
-        # Number mapping
-        if number_code == 'S':
-            morph['number'] = 'singular'
-        elif number_code == 'P':
-            morph['number'] = 'plural'
-        
-        # Gender mapping
-        if gender_code:
-            gender_map = {'M': 'masculine', 'F': 'feminine', 'N': 'neuter'}
-            if gender_code in gender_map:
-                morph['gender'] = gender_map[gender_code]
-        
+    decoder = MORPH_DECODERS.get(morph_code[0])
+    morph = decoder(morph_code) if decoder else None
+    if morph is not None:
         return morph
     
-    # Verb pattern: V..-...#. where positions are tense/voice/mood/person/number
-    verb_match = re.match(r'V([A-Z]{2})-([A-Z])([A-Z])([A-Z])(\d)?(.)?', morph_code)
-    if verb_match:
-        morph['pos'] = 'verb'
-        tense_code = verb_match.group(1)
-        voice_code = verb_match.group(2)
-        mood_code = verb_match.group(3)
-        tense_variant = verb_match.group(4)
-        person_code = verb_match.group(5)
-        number_code = verb_match.group(6)
-        
-        # Tense mapping
-        tense_map = {
-            'PA': 'present', 'IA': 'imperfect', 'FA': 'future',
-            'AA': 'aorist', 'XA': 'perfect', 'YA': 'pluperfect',
-            'AI': 'aorist'  # Alternative aorist code
-        }
-        if tense_code in tense_map:
-            morph['tense'] = tense_map[tense_code]
-        
-        # Voice mapping
-        voice_map = {'A': 'active', 'M': 'middle', 'P': 'passive'}
-        if voice_code in voice_map:
-            morph['voice'] = voice_map[voice_code]
-        
-        # Mood mapping
-        mood_map = {'I': 'indicative', 'S': 'subjunctive', 'O': 'optative', 
-                    'D': 'imperative', 'N': 'infinitive', 'P': 'participle'}
-        if mood_code in mood_map:
-            morph['mood'] = mood_map[mood_code]
-        
-        # Person
-        if person_code:
-            person_map = {'1': '1st', '2': '2nd', '3': '3rd'}
-            if person_code in person_map:
-                morph['person'] = person_map[person_code]
-        
-        # Number
-        if number_code:
-            if number_code == 'S':
-                morph['number'] = 'singular'
-            elif number_code == 'P':
-                morph['number'] = 'plural'
-        
-        return morph
-    
-    # Article pattern: RA-CSG (pRonoun-Article)
-    article_match = re.match(r'RA?-?(.)(.)(.)?', morph_code)
-    if article_match or morph_code.startswith('RA'):
-        morph['pos'] = 'pronoun'  # Articles stored as pronouns
-        parts = morph_code.replace('RA-', '').replace('RA', '')
-        if len(parts) >= 2:
-            case_code = parts[0] if len(parts) > 0 else None
-            number_code = parts[1] if len(parts) > 1 else None
-            gender_code = parts[2] if len(parts) > 2 else None
-            
-            case_map = {'N': 'nominative', 'G': 'genitive', 'D': 'dative', 'A': 'accusative', 'V': 'vocative'}
-            if case_code in case_map:
-                morph['case'] = case_map[case_code]
-            
-            if number_code == 'S':
-                morph['number'] = 'singular'
-            elif number_code == 'P':
-                morph['number'] = 'plural'
-            
-            if gender_code:
-                gender_map = {'M': 'masculine', 'F': 'feminine', 'N': 'neuter'}
-                if gender_code in gender_map:
-                    morph['gender'] = gender_map[gender_code]
-        
-        return morph
-    
-    # Adjective pattern: similar to noun
-    adj_match = re.match(r'A(\d+)-(.)(.)(.*)', morph_code)
-    if adj_match:
-        morph['pos'] = 'adjective'
-        case_code = adj_match.group(2)
-        number_code = adj_match.group(3)
-        gender_code = adj_match.group(4) if adj_match.group(4) else None
-        
-        case_map = {'N': 'nominative', 'G': 'genitive', 'D': 'dative', 'A': 'accusative', 'V': 'vocative'}
-        if case_code in case_map:
-            morph['case'] = case_map[case_code]
-        
-        if number_code == 'S':
-            morph['number'] = 'singular'
-        elif number_code == 'P':
-            morph['number'] = 'plural'
-        
-        if gender_code:
-            gender_map = {'M': 'masculine', 'F': 'feminine', 'N': 'neuter'}
-            if gender_code in gender_map:
-                morph['gender'] = gender_map[gender_code]
-        
-        return morph
-    
-    # Simple POS codes
-    simple_pos = {
-        'P': 'preposition',
-        'C': 'conjunction',
-        'D': 'adverb',
-        'T': 'particle',
-        'X': 'interjection'
-    }
-    
-    if morph_code[0] in simple_pos:
-        morph['pos'] = simple_pos[morph_code[0]]
-        return morph
+    if morph_code[0] in SIMPLE_POS:
+        return {'pos': SIMPLE_POS[morph_code[0]]}
     
     # If we can't parse it, return what we have
     print(f"Warning: Could not fully parse morphology code: {morph_code}")
-    return morph
+    return {}
 
 
 def extract_strong_number(lemma: str) -> Optional[str]:
     """Extract Strong's number from lemma field (e.g., 'strong:G746' -> 'G746')"""
-    if 'strong:' in lemma:
-        return lemma.split('strong:')[1]
-    return None
+    _, sep, rest = lemma.partition('strong:')
+    if not sep:
+        return None
+    # Up to any further 'strong:' entry
+    return rest.partition('strong:')[0]
 
 
 # LXX Book mapping (OT books)
@@ -221,6 +211,9 @@ LXX_BOOKS = {
 }
 
 
+WORD_RE = re.compile(r'<w\s+lemma="([^"]*)"\s+morph="([^"]*)"\s*[^>]*>([^<]*)</w>')
+
+
 def parse_osis_verse(osis_text: str) -> List[Dict]:
     """
     Parse OSIS XML to extract words with morphology.
@@ -231,12 +224,11 @@ def parse_osis_verse(osis_text: str) -> List[Dict]:
     words = []
     
     # Find all <w> tags
-    word_pattern = r'<w\s+lemma="([^"]*)"\s+morph="([^"]*)"\s*[^>]*>([^<]*)</w>'
-    matches = re.findall(word_pattern, osis_text)
-    
-    for lemma, morph, word_text in matches:
+    for lemma, morph, word_text in WORD_RE.findall(osis_text):
+        word = word_text.strip()
+        
         # Skip empty words
-        if not word_text.strip():
+        if not word:
             continue
         
         # Parse morphology
@@ -246,9 +238,9 @@ def parse_osis_verse(osis_text: str) -> List[Dict]:
         strong_num = extract_strong_number(lemma)
         
         words.append({
-            'word': word_text.strip(),
+            'word': word,
             'strong_number': strong_num,
-            'lemma': word_text.strip(),  # For now, use the word itself as lemma
+            'lemma': word,  # For now, use the word itself as lemma
             'morph_code': morph.replace('packard:', ''),
             'morphology': parsed_morph
         })
@@ -269,11 +261,18 @@ def import_lxx_to_database(sword_dir: str, db_path: str):
     modules = SwordModules(sword_dir)
     modules.parse_modules()
     lxx = modules.get_bible_from_module('LXX')
+    bible_structure = lxx.get_structure()
     print("[OK] LXX module loaded")
     
-    # Connect to database
+    # Connect to database, tuned for a one-off bulk load
     conn = sqlite3.connect(db_path)
     cursor = conn.cursor()
+    cursor.executescript("""
+        PRAGMA journal_mode=WAL;
+        PRAGMA synchronous=OFF;
+        PRAGMA temp_store=memory;
+        PRAGMA cache_size=-200000;
+    """)
     
     # Add LXX books to books table if needed
     print("\nAdding LXX books to database...")
@@ -286,83 +285,91 @@ def import_lxx_to_database(sword_dir: str, db_path: str):
     conn.commit()
     print(f"[OK] Added {len(LXX_BOOKS)} LXX books")
     
+    # Drop the secondary indexes on words during the load and rebuild each one
+    # in a single pass afterwards, instead of updating them for every row
+    indexes = cursor.execute(
+        "SELECT name, sql FROM sqlite_master WHERE type = 'index' AND tbl_name = 'words' AND sql IS NOT NULL"
+    ).fetchall()
+    for index_name, _ in indexes:
+        cursor.execute(f"DROP INDEX {index_name}")
+    conn.commit()
+    
     # Import words from each book
     total_words = 0
     
-    for book_name, (book_code, book_abbrev) in LXX_BOOKS.items():
-        print(f"\nProcessing {book_name}...")
-        
-        try:
-            # Get book structure (how many chapters)
-            # Try to get first 50 chapters (most books have fewer)
-            book_words = 0
+    try:
+        for book_name, (book_code, book_abbrev) in LXX_BOOKS.items():
+            print(f"\nProcessing {book_name}...")
             
-            for chapter in range(1, 151):  # Max 150 chapters (Psalms)
-                try:
-                    # Get all verses in the chapter
-                    # Try up to 200 verses (some chapters are long)
-                    for verse in range(1, 201):
-                        try:
-                            # Get verse with morphology
-                            verse_data = lxx.get(books=[book_name], chapters=[chapter], verses=[verse], clean=False)
-                            
-                            if not verse_data:
-                                break  # No more verses in this chapter
-                            
-                            # Parse OSIS to extract words
-                            verse_text = str(verse_data)
-                            words = parse_osis_verse(verse_text)
-                            
-                            # Insert words into database
-                            for word_position, word_data in enumerate(words, 1):
-                                morph = word_data['morphology']
-                                
-                                cursor.execute("""
-                                    INSERT INTO words (
-                                        book_code, chapter, verse, word_position, word, lemma,
-                                        morph_code, pos, tense, voice, mood, case_value, 
-                                        number, gender, person, corpus
-                                    ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, 'LXX')
-                                """, (
-                                    book_code, chapter, verse, word_position,
-                                    word_data['word'], word_data['lemma'],
-                                    word_data['morph_code'],
-                                    morph.get('pos'),
-                                    morph.get('tense'),
-                                    morph.get('voice'),
-                                    morph.get('mood'),
-                                    morph.get('case'),
-                                    morph.get('number'),
-                                    morph.get('gender'),
-                                    morph.get('person')
-                                ))
-                                
-                                book_words += 1
-                                total_words += 1
-                            
-                        except Exception as e:
-                            # Probably no more verses in this chapter
-                            break
+            try:
+                # Rows for this book, inserted with a single executemany
+                rows = []
+                
+                # The module's versification gives every (chapter, verse) in
+                # the book, and get_iter yields the verses in that same order,
+                # so the whole book is read in one pass without probing
+                _, structure = bible_structure.find_book(book_name)
+                refs = [
+                    (chapter, verse)
+                    for chapter, num_verses in enumerate(structure.chapter_lengths, 1)
+                    for verse in range(1, num_verses + 1)
+                ]
+                verse_texts = lxx.get_iter(books=[book_name], clean=False)
+                
+                for (chapter, verse), verse_text in zip(refs, verse_texts):
+                    if not verse_text:
+                        continue  # Verse missing from the module
                     
-                    # Commit after each chapter
-                    if book_words > 0:
-                        conn.commit()
+                    # Parse OSIS to extract words
+                    words = parse_osis_verse(verse_text)
                     
-                except Exception as e:
-                    # Probably no more chapters in this book
-                    break
-            
-            print(f"  [OK] {book_name} completed ({book_words} words, {total_words} total)")
-            
-        except Exception as e:
-            print(f"  [ERROR] {book_name}: {e}")
-            continue
+                    for word_position, word_data in enumerate(words, 1):
+                        morph = word_data['morphology']
+                        rows.append((
+                            book_code, chapter, verse, word_position,
+                            word_data['word'], word_data['lemma'],
+                            word_data['morph_code'],
+                            morph.get('pos'),
+                            morph.get('tense'),
+                            morph.get('voice'),
+                            morph.get('mood'),
+                            morph.get('case'),
+                            morph.get('number'),
+                            morph.get('gender'),
+                            morph.get('person')
+                        ))
+                
+                # Insert the whole book and commit once
+                cursor.executemany("""
+                    INSERT INTO words (
+                        book_code, chapter, verse, word_position, word, lemma,
+                        morph_code, pos, tense, voice, mood, case_value, 
+                        number, gender, person, corpus
+                    ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, 'LXX')
+                """, rows)
+                conn.commit()
+                
+                book_words = len(rows)
+                total_words += book_words
+                print(f"  [OK] {book_name} completed ({book_words} words, {total_words} total)")
+                
+            except Exception as e:
+                conn.rollback()
+                print(f"  [ERROR] {book_name}: {e}")
+                continue
+    finally:
+        # Rebuild the dropped indexes, then bring the query indexes, the
+        # full-text index and planner statistics up to date with the new rows
+        print("\nRebuilding indexes...")
+        for _, index_sql in indexes:
+            cursor.execute(index_sql)
+        migrate(conn, rebuild_fts=True)
+        print("[OK] Indexes rebuilt")
+        conn.close()
     
     print("\n" + "=" * 60)
     print(f"LXX import complete! Imported {total_words} words from {len(LXX_BOOKS)} books.")
     print("=" * 60)
-    
-    conn.close()
 
 
 if __name__ == "__main__":
@@ -0,0 +1,153 @@
+"""
+Script to add the query indexes and derived search tables used by the app to an
+existing greek_nt.db database.
+
+Run this once to upgrade a database created by an older version of the app:
+    python migrate_database.py
+
+It is also called automatically by setup_database.py and lxx_importer.py, and is
+safe to run repeatedly.
+"""
+
+import sqlite3
+import os
+from contextlib import closing
+
+DATABASE = "greek_nt.db"
+
+# Indexes on the hot query paths
+INDEXES = [
+    # Covering index for verse-text reads: words come back in order straight from the index
+    "CREATE INDEX IF NOT EXISTS idx_words_verse ON words(book_code, chapter, verse, word_position, word)",
+    # Lemma lookups (exact lemma filters in /api/search, lemma + corpus in
+    # advanced search), answered in verse order from the index
+    "CREATE INDEX IF NOT EXISTS idx_words_lemma_corpus ON words(lemma, corpus, book_code, chapter, verse, word_position)",
+    # Morphology-only searches (e.g. [verb]@pAI3s), most selective columns first
+    "CREATE INDEX IF NOT EXISTS idx_words_morph ON words(pos, tense, voice, mood, case_value, number, gender, person)",
+]
+
+# Single-column indexes made by older versions. Each is a prefix of
+# idx_words_lemma_corpus or idx_words_morph, or otherwise unused by the app's
+# queries, and only adds size and insert cost, so they are dropped.
+REDUNDANT_INDEXES = [
+    "idx_lemma", "idx_pos", "idx_tense", "idx_voice", "idx_mood",
+    "idx_case", "idx_number", "idx_gender", "idx_corpus",
+]
+
+# Full-text index over words for substring text search. The trigram tokenizer
+# matches any substring of 3+ characters, like the LIKE '%text%' it replaces;
+# case_sensitive keeps Greek matching exact, as LIKE does for non-ASCII text.
+FTS_TABLE_SQL = """
+    CREATE VIRTUAL TABLE IF NOT EXISTS words_fts USING fts5(
+        word, lemma, content=words, content_rowid=id,
+        tokenize='trigram case_sensitive 1'
+    )
+"""
+
+
+def migrate_fts(conn: sqlite3.Connection, rebuild: bool = False):
+    """
+    Make sure words_fts uses the trigram tokenizer, recreating it if needed.
+    The index is rebuilt from words when it is recreated or rebuild is set
+    (after new rows have been bulk-loaded into words).
+    """
+    row = conn.execute("SELECT sql FROM sqlite_master WHERE name = 'words_fts'").fetchone()
+    if row is None or "trigram" not in row[0]:
+        conn.execute("DROP TABLE IF EXISTS words_fts")
+        conn.execute(FTS_TABLE_SQL)
+        rebuild = True
+    if rebuild:
+        conn.execute("INSERT INTO words_fts (words_fts) VALUES ('rebuild')")
+
+
+# Morphology columns offered as search filters, keyed by their /api/morphology/options name
+MORPH_CATEGORIES = {
+    "pos": "pos", "tense": "tense", "voice": "voice", "mood": "mood",
+    "case": "case_value", "number": "number", "gender": "gender", "person": "person",
+}
+
+# Every distinct (category, value) pair in words
+MORPH_OPTIONS_SELECT = " UNION ALL ".join(
+    f"SELECT '{category}' AS category, value FROM "
+    f"(SELECT DISTINCT {column} AS value FROM words WHERE {column} IS NOT NULL)"
+    for category, column in MORPH_CATEGORIES.items()
+)
+
+
+def migrate_morph_options(conn: sqlite3.Connection):
+    """(Re)build morph_options, the small table behind /api/morphology/options."""
+    conn.execute("DROP TABLE IF EXISTS morph_options")
+    conn.execute("""
+        CREATE TABLE morph_options (
+            category TEXT NOT NULL,
+            value TEXT NOT NULL,
+            PRIMARY KEY (category, value)
+        ) WITHOUT ROWID
+    """)
+    conn.execute(f"INSERT INTO morph_options (category, value) {MORPH_OPTIONS_SELECT}")
+
+
+def migrate_verse_lemmas(conn: sqlite3.Connection):
+    """(Re)build verse_lemmas, one row per distinct lemma in each verse, for relative search."""
+    conn.execute("DROP TABLE IF EXISTS verse_lemmas")
+    conn.execute("""
+        CREATE TABLE verse_lemmas (
+            lemma TEXT NOT NULL,
+            corpus TEXT NOT NULL,
+            book_code TEXT NOT NULL,
+            chapter INTEGER NOT NULL,
+            verse INTEGER NOT NULL,
+            PRIMARY KEY (lemma, corpus, book_code, chapter, verse)
+        ) WITHOUT ROWID
+    """)
+    conn.execute("""
+        INSERT INTO verse_lemmas (lemma, corpus, book_code, chapter, verse)
+        SELECT DISTINCT lemma, corpus, book_code, chapter, verse
+        FROM words
+        WHERE lemma IS NOT NULL AND lemma != ''
+    """)
+
+
+def migrate(conn: sqlite3.Connection, rebuild_fts: bool = False):
+    """
+    Create any missing indexes and search tables, drop redundant ones, refresh the query planner
+    statistics, and switch the database file to WAL mode.
+    """
+    for index_name in REDUNDANT_INDEXES:
+        conn.execute(f"DROP INDEX IF EXISTS {index_name}")
+    for sql in INDEXES:
+        conn.execute(sql)
+    migrate_fts(conn, rebuild_fts)
+    migrate_morph_options(conn)
+    migrate_verse_lemmas(conn)
+    conn.execute("ANALYZE")
+    conn.commit()
+    # WAL is stored in the file, so the app's readers find it already set
+    # instead of racing each other to convert the journal on first open
+    conn.execute("PRAGMA journal_mode=WAL")
+
+
+def main():
+    print("=" * 60)
+    print("Greek NT Database Migration")
+    print("=" * 60)
+    print()
+
+    if not os.path.exists(DATABASE):
+        print(f"Error: {DATABASE} not found.")
+        print("Please run 'python setup_database.py' first.")
+        return
+
+    with closing(sqlite3.connect(DATABASE)) as conn:
+        print("Creating indexes, search tables and analyzing tables...")
+        migrate(conn)
+        print(f"  [OK] {len(INDEXES)} indexes, words_fts, morph_options and verse_lemmas in place")
+
+    print()
+    print("=" * 60)
+    print("Migration complete!")
+    print("=" * 60)
+
+
+if __name__ == "__main__":
+    main()
@@ -9,6 +9,7 @@ Syntax Examples:
 """
 
 import re
+import functools
 from typing import List, Dict, Any, Tuple, Optional
 import sqlite3
 
@@ -102,6 +103,17 @@ BOOK_ABBREVIATIONS = {
     'Rev': '27', 'Rev.': '27', 'Re': '27', 'Revelation': '27',
 }
 
+# Book names are looked up case-insensitively, ignoring spaces and periods
+BOOK_KEY_STRIP = str.maketrans('', '', ' .')
+
+
+def book_key(name: str) -> str:
+    """Normalize a book name or abbreviation for lookup (e.g. '1 Cor.' -> '1cor')."""
+    return name.lower().translate(BOOK_KEY_STRIP)
+
+
+BOOK_CODES = {book_key(abbrev): code for abbrev, code in BOOK_ABBREVIATIONS.items()}
+
 # Special tokens for parts of speech
 # Note: Articles are marked as pronouns with morph code starting with 'RA'
 SPECIAL_TOKENS = {
@@ -117,6 +129,73 @@ SPECIAL_TOKENS = {
 }
 
 
+def _special_token_sql(token_morph: Dict[str, str]) -> Tuple[str, Tuple[str, ...]]:
+    """Build the SQL condition and parameters for one special token."""
+    conditions = []
+    params = []
+    for field, value in token_morph.items():
+        if field == 'morph_prefix':
+            # Special handling for morph code prefix (e.g., RA for articles)
+            conditions.append("morph_code LIKE ?")
+            params.append(f"{value}%")
+        else:
+            conditions.append(f"{field} = ?")
+            params.append(value)
+    return " AND ".join(conditions), tuple(params)
+
+
+# SQL condition and parameters for each special token, built once at import
+SPECIAL_TOKEN_SQL = {token: _special_token_sql(morph) for token, morph in SPECIAL_TOKENS.items()}
+
+
+# Query syntax patterns, compiled once at import. The book filter and trailing
+# W# are split off by the scanners below instead.
+RELATIVE_RE = re.compile(r'^\*?\s*rel\s+(.+)$', re.IGNORECASE)  # rel <verse ref>
+INFERENCE_RE = re.compile(r'^\*?\s*inf\s+(.+)$', re.IGNORECASE)  # inf <verse ref>
+SPECIAL_TOKEN_RE = re.compile(r'\[(\w+)\](?:@(.+))?')  # [token]@codes
+
+
+# Flat lookups built from MORPH_CODE_ORDER: the POS letters, and for every other
+# code character the (category, value) pairs it can mean, in category order
+POS_CODES = dict(MORPH_CODE_ORDER)['pos']
+CHAR_TO_FIELDS: Dict[str, List[Tuple[str, str]]] = {}
+for _category, _mapping in MORPH_CODE_ORDER:
+    if _category != 'pos':
+        for _char, _value in _mapping.items():
+            CHAR_TO_FIELDS.setdefault(_char, []).append((_category, _value))
+MORPH_CATEGORIES = [category for category, _ in MORPH_CODE_ORDER]
+
+
+@functools.lru_cache(maxsize=1024)
+def _parse_morph_cached(codes: str) -> Tuple[Tuple[str, str], ...]:
+    """
+    Parse morphology codes into (field, value) pairs, in MORPH_CODE_ORDER order.
+    Pure in codes, so results are cached; common codes like Nsg are reused across queries.
+    
+    Each character fills the first category it can mean that is still empty
+    (checked in MORPH_CODE_ORDER order), and a character is used at most once.
+    """
+    morph = {}
+    used_chars = set()
+    
+    # Special handling: POS should only match first character if it's uppercase
+    if codes and codes[0].isupper() and codes[0] in POS_CODES:
+        morph['pos'] = POS_CODES[codes[0]]
+        used_chars.add(codes[0])
+    
+    # One pass over the codes
+    for char in codes:
+        if char in used_chars:
+            continue
+        for category, value in CHAR_TO_FIELDS.get(char, ()):
+            if category not in morph:
+                morph[category] = value
+                used_chars.add(char)
+                break
+    
+    return tuple((category, morph[category]) for category in MORPH_CATEGORIES if category in morph)
+
+
 class SearchTerm:
     """Represents a single search term in the query."""
     
@@ -128,30 +207,8 @@ class SearchTerm:
     
     def _parse_morphology(self, codes: str) -> Dict[str, str]:
         """Parse morphology codes into database field values."""
-        morph = {}
-        used_chars = set()
-        
-        # Special handling: POS should only match first character if it's uppercase
-        if codes and codes[0].isupper():
-            for category, mapping in MORPH_CODE_ORDER:
-                if category == 'pos' and codes[0] in mapping:
-                    morph['pos'] = mapping[codes[0]]
-                    used_chars.add(codes[0])
-                    break
-        
-        # Process remaining codes in order
-        for category, mapping in MORPH_CODE_ORDER:
-            if category == 'pos':  # Already handled above
-                continue
-            for char in codes:
-                if char in used_chars:
-                    continue
-                if char in mapping:
-                    morph[category] = mapping[char]
-                    used_chars.add(char)
-                    break  # Only take first match per category
-        
-        return morph
+        # A fresh dict each time, so callers may modify it without touching the cache
+        return dict(_parse_morph_cached(str(codes)))
     
     def to_sql_conditions(self) -> Tuple[str, List[Any]]:
         """Convert to SQL WHERE conditions."""
@@ -162,16 +219,10 @@ class SearchTerm:
             conditions.append("lemma = ?")
             params.append(self.lemma)
         
-        if self.special_token and self.special_token in SPECIAL_TOKENS:
-            token_morph = SPECIAL_TOKENS[self.special_token]
-            for field, value in token_morph.items():
-                if field == 'morph_prefix':
-                    # Special handling for morph code prefix (e.g., RA for articles)
-                    conditions.append("morph_code LIKE ?")
-                    params.append(f"{value}%")
-                else:
-                    conditions.append(f"{field} = ?")
-                    params.append(value)
+        if self.special_token in SPECIAL_TOKEN_SQL:
+            token_conditions, token_params = SPECIAL_TOKEN_SQL[self.special_token]
+            conditions.append(token_conditions)
+            params.extend(token_params)
         
         for field, value in self.morphology.items():
             if field == 'case':
@@ -209,6 +260,41 @@ class Query:
         return f"Query(terms={self.terms}, proximity={self.proximity}, whole_nt={self.whole_nt}, books={self.book_codes})"
 
 
+def _split_book_filter(query_string: str) -> Optional[Tuple[str, str]]:
+    """
+    Split '[Book, Book] + query' into the book list and the query, or return
+    None if query_string has no book filter. The query runs to the end of its
+    first line.
+    """
+    if not query_string.startswith('['):
+        return None
+    close = query_string.find(']')
+    if close < 2:
+        return None
+    rest = query_string[close + 1:].lstrip()
+    if not rest.startswith('+'):
+        return None
+    rest = rest[1:].lstrip()
+    if not rest:
+        return None
+    return query_string[1:close], rest.partition('\n')[0]
+
+
+def _split_proximity(query_string: str) -> Tuple[str, Optional[int]]:
+    """
+    Split a trailing ' W#' off query_string, scanning back from the end.
+    Returns (the rest of the query, the distance), or (query_string, None).
+    """
+    end = len(query_string.rstrip())
+    start = end
+    while start > 0 and query_string[start - 1].isdecimal():
+        start -= 1
+    if (start == end or start < 2 or query_string[start - 1] not in 'Ww'
+            or not query_string[start - 2].isspace()):
+        return query_string, None
+    return query_string[:start - 1].strip(), int(query_string[start:end])
+
+
 def parse_query(query_string: str) -> Query:
     """
     Parse a query string into a Query object.
@@ -228,29 +314,30 @@ def parse_query(query_string: str) -> Query:
     query_string = query_string.strip()
     
     # Check for book specification first: [Book, Book] + query
-    book_match = re.match(r'\[([^\]]+)\]\s*\+\s*(.+)', query_string)
-    if book_match:
+    book_filter = _split_book_filter(query_string)
+    if book_filter:
         # Extract book abbreviations
-        book_str = book_match.group(1)
-        book_abbrevs = [b.strip() for b in book_str.split(',')]
+        book_str, rest = book_filter
         
-        # Map to book codes
-        for abbrev in book_abbrevs:
-            if abbrev in BOOK_ABBREVIATIONS:
-                query.book_codes.append(BOOK_ABBREVIATIONS[abbrev])
+        # Map to book codes, skipping unknown names
+        book_codes_get = BOOK_CODES.get
+        query.book_codes = [
+            code for code in (book_codes_get(book_key(abbrev)) for abbrev in book_str.split(','))
+            if code
+        ]
         
         # Continue parsing the rest of the query
-        query_string = book_match.group(2).strip()
+        query_string = rest.strip()
     
     # Check for relative search: *rel <verse ref> or rel <verse ref>
-    rel_match = re.match(r'^\*?\s*rel\s+(.+)$', query_string, re.IGNORECASE)
+    rel_match = RELATIVE_RE.match(query_string)
     if rel_match:
         query.is_relative_search = True
         query.relative_verse_ref = rel_match.group(1).strip()
         return query
     
     # Check for inference search: *inf <verse ref> or inf <verse ref>
-    inf_match = re.match(r'^\*?\s*inf\s+(.+)$', query_string, re.IGNORECASE)
+    inf_match = INFERENCE_RE.match(query_string)
     if inf_match:
         query.is_inference_search = True
         query.inference_verse_ref = inf_match.group(1).strip()
@@ -262,40 +349,59 @@ def parse_query(query_string: str) -> Query:
         query_string = query_string[1:].strip()
     
     # Check for proximity at the end (W#)
-    proximity_match = re.search(r'\s+W(\d+)\s*$', query_string, re.IGNORECASE)
-    if proximity_match:
-        query.proximity = int(proximity_match.group(1))
-        query_string = query_string[:proximity_match.start()].strip()
+    query_string, proximity = _split_proximity(query_string)
+    if proximity is not None:
+        query.proximity = proximity
     
     # Split by & to get multiple terms
-    term_strings = [t.strip() for t in query_string.split('&')]
-    
-    for term_str in term_strings:
+    terms_append = query.terms.append
+    for term_str in query_string.split('&'):
+        term_str = term_str.strip()
         if not term_str:
             continue
         
         # Check if it's a special token (with optional morphology codes)
-        special_token_match = re.match(r'\[(\w+)\](?:@(.+))?', term_str)
+        special_token_match = SPECIAL_TOKEN_RE.match(term_str)
         if special_token_match:
-            token = f"[{special_token_match.group(1)}]"
-            codes = special_token_match.group(2) if special_token_match.group(2) else ""
-            query.terms.append(SearchTerm(special_token=token, morph_codes=codes))
+            token, codes = special_token_match.groups('')
+            terms_append(SearchTerm(special_token=f"[{token}]", morph_codes=codes))
             continue
         
-        # Parse lemma@codes format
-        if '@' in term_str:
-            parts = term_str.split('@', 1)
-            lemma = parts[0].strip()
-            codes = parts[1].strip() if len(parts) > 1 else ""
-            query.terms.append(SearchTerm(lemma=lemma, morph_codes=codes))
-        else:
-            # Just a lemma without codes
-            lemma = term_str.strip()
-            query.terms.append(SearchTerm(lemma=lemma))
+        # Parse lemma@codes format (or just a lemma without codes)
+        lemma, _, codes = term_str.partition('@')
+        terms_append(SearchTerm(lemma=lemma.strip(), morph_codes=codes.strip()))
     
     return query
 
 
+# Keys of each result dict, in the order of the selected columns
+RESULT_KEYS = (
+    'book_code', 'chapter', 'verse', 'word', 'lemma', 'morph_code', 'pos', 'tense',
+    'voice', 'mood', 'case', 'number', 'gender', 'person',
+)
+
+
+@functools.lru_cache(maxsize=64)
+def _filter_placeholders(book_slots: int, corpus_count: int) -> str:
+    """The book/corpus filter appended to a term's conditions, for the given list sizes."""
+    conditions = ""
+    if book_slots:
+        conditions += f" AND book_code IN ({','.join('?' * book_slots)})"
+    conditions += f" AND corpus IN ({','.join('?' * corpus_count)})"
+    return conditions
+
+
+def _filter_sql(book_codes: List[str], corpora: List[str]) -> Tuple[str, List[Any]]:
+    """
+    Build the book and corpus filter for a query: (conditions, params).
+    The book list is padded with NULLs to the next power of two, so the SQL
+    text (and sqlite3's cached statement) is shared by nearby list sizes.
+    """
+    book_slots = 1 << (len(book_codes) - 1).bit_length() if book_codes else 0
+    params = list(book_codes) + [None] * (book_slots - len(book_codes)) + list(corpora)
+    return _filter_placeholders(book_slots, len(corpora)), params
+
+
 def execute_query(conn: sqlite3.Connection, query: Query, corpora: List[str] = None) -> List[Dict[str, Any]]:
     """
     Execute a parsed query against the database.
@@ -321,16 +427,10 @@ def execute_query(conn: sqlite3.Connection, query: Query, corpora: List[str] = N
         term = query.terms[0]
         conditions, params = term.to_sql_conditions()
         
-        # Add book filtering if specified
-        if query.book_codes:
-            placeholders = ','.join('?' * len(query.book_codes))
-            conditions += f" AND book_code IN ({placeholders})"
-            params.extend(query.book_codes)
-        
-        # Add corpus filtering
-        corpus_placeholders = ','.join('?' * len(corpora))
-        conditions += f" AND corpus IN ({corpus_placeholders})"
-        params.extend(corpora)
+        # Add book and corpus filtering
+        filter_conditions, filter_params = _filter_sql(query.book_codes, corpora)
+        conditions += filter_conditions
+        params.extend(filter_params)
         
         sql = f"""
             SELECT DISTINCT 
@@ -343,24 +443,7 @@ def execute_query(conn: sqlite3.Connection, query: Query, corpora: List[str] = N
         """
         
         cursor.execute(sql, params)
-        results = []
-        for row in cursor.fetchall():
-            results.append({
-                'book_code': row[0],
-                'chapter': row[1],
-                'verse': row[2],
-                'word': row[3],
-                'lemma': row[4],
-                'morph_code': row[5],
-                'pos': row[6],
-                'tense': row[7],
-                'voice': row[8],
-                'mood': row[9],
-                'case': row[10],
-                'number': row[11],
-                'gender': row[12],
-                'person': row[13],
-            })
+        results = [dict(zip(RESULT_KEYS, row)) for row in cursor]
         
         return results
     
@@ -369,107 +452,105 @@ def execute_query(conn: sqlite3.Connection, query: Query, corpora: List[str] = N
         return execute_proximity_search(conn, query, corpora)
 
 
+# Columns returned for each matched word in a proximity search
+PROXIMITY_COLUMNS = [
+    'book_code', 'chapter', 'verse', 'word', 'lemma', 'morph_code', 'pos', 'tense',
+    'voice', 'mood', 'case_value', 'number', 'gender', 'person',
+]
+
+
+@functools.lru_cache(maxsize=256)
+def _proximity_sql(first_conditions: str, later_conditions: Tuple[str, ...], adjacent: bool) -> str:
+    """
+    Build the proximity self-join for one shape of query. Values are all bound
+    as parameters, so repeated queries reuse the same text (and sqlite3's
+    prepared statement for it).
+    
+    Term conditions use bare column names, so each sits in its own
+    single-table scope (a words subquery, or the x lookup for later terms).
+    Adjacent terms (W1, the default) join the very next word directly; wider
+    windows find the nearest match with a correlated MIN(word_position), and
+    bind the distance before each later term's values.
+    """
+    if adjacent:
+        joins = "".join(f"""
+            JOIN (SELECT * FROM words WHERE {conditions}) w{i}
+              ON w{i}.book_code = w0.book_code AND w{i}.chapter = w0.chapter AND w{i}.verse = w0.verse
+             AND w{i}.word_position = w{i - 1}.word_position + 1""" for i, conditions in enumerate(later_conditions, 1))
+    else:
+        joins = "".join(f"""
+            JOIN words w{i}
+              ON w{i}.book_code = w0.book_code AND w{i}.chapter = w0.chapter AND w{i}.verse = w0.verse
+             AND w{i}.word_position = (
+                SELECT MIN(word_position) FROM words x
+                WHERE x.book_code = w0.book_code AND x.chapter = w0.chapter AND x.verse = w0.verse
+                  AND x.word_position > w{i - 1}.word_position
+                  AND x.word_position <= w{i - 1}.word_position + ?
+                  AND {conditions}
+             )""" for i, conditions in enumerate(later_conditions, 1))
+    
+    term_count = len(later_conditions) + 1
+    columns = ", ".join(
+        f"w{i}.{column}" for i in range(term_count) for column in PROXIMITY_COLUMNS
+    )
+    
+    # Each match yields one result per term; fetch just enough matches for 500 results
+    max_matches = -(-500 // term_count)
+    return f"""
+        SELECT {columns}
+        FROM (SELECT * FROM words WHERE {first_conditions}) w0
+        {joins}
+        ORDER BY w0.book_code, w0.chapter, w0.verse, w0.word_position
+        LIMIT {max_matches}
+    """
+
+
 def execute_proximity_search(conn: sqlite3.Connection, query: Query, corpora: List[str] = None) -> List[Dict[str, Any]]:
     """
     Execute a multi-term search with optional proximity constraint.
-    """
-    cursor = conn.cursor()
-    results = []
     
+    Each later term must match within max_distance words after the previous
+    term's match; the nearest such word is taken. The whole chain runs as one
+    self-join over the words of each verse (see _proximity_sql).
+    """
     # Default to all corpora if not specified
     if corpora is None:
         corpora = ['NT', 'LXX']
     
-    # Build queries for each term
-    term_queries = []
-    for i, term in enumerate(query.terms):
+    # Conditions and parameters for each term, as parallel lists
+    term_conditions = []
+    term_params = []
+    for term in query.terms:
         conditions, params = term.to_sql_conditions()
-        term_queries.append((conditions, params))
+        term_conditions.append(conditions)
+        term_params.append(params)
     
     # If no proximity specified, they must be adjacent (next word)
     max_distance = query.proximity if query.proximity else 1
     
-    # Get all matches for first term
-    first_conditions, first_params = term_queries[0]
-    
-    # Add book filtering if specified
-    if query.book_codes:
-        placeholders = ','.join('?' * len(query.book_codes))
-        first_conditions += f" AND book_code IN ({placeholders})"
-        first_params.extend(query.book_codes)
-    
-    # Add corpus filtering
-    corpus_placeholders = ','.join('?' * len(corpora))
-    first_conditions += f" AND corpus IN ({corpus_placeholders})"
-    first_params.extend(corpora)
-    
-    sql = f"""
-        SELECT id, book_code, chapter, verse, word_position, 
-               word, lemma, morph_code, pos, tense, voice, mood, 
-               case_value, number, gender, person
-        FROM words 
-        WHERE {first_conditions}
-        ORDER BY book_code, chapter, verse, word_position
-    """
+    # Matches for the first term
+    first_conditions = term_conditions[0]
+    params = term_params[0]
     
-    cursor.execute(sql, first_params)
-    first_matches = cursor.fetchall()
+    # Add book and corpus filtering
+    filter_conditions, filter_params = _filter_sql(query.book_codes, corpora)
+    first_conditions += filter_conditions
+    params.extend(filter_params)
     
-    # For each match of the first term, look for subsequent terms nearby
-    for first_match in first_matches:
-        first_id, book_code, chapter, verse, word_pos = first_match[:5]
-        
-        # Check if all subsequent terms exist within proximity
-        all_found = True
-        last_pos = word_pos
-        matched_words = [first_match]
-        
-        for i in range(1, len(query.terms)):
-            conditions, params = term_queries[i]
-            
-            # Look for this term within max_distance words
-            search_sql = f"""
-                SELECT id, book_code, chapter, verse, word_position,
-                       word, lemma, morph_code, pos, tense, voice, mood,
-                       case_value, number, gender, person
-                FROM words
-                WHERE book_code = ? AND chapter = ? AND verse = ?
-                  AND word_position > ? AND word_position <= ?
-                  AND {conditions}
-                ORDER BY word_position
-                LIMIT 1
-            """
-            
-            search_params = [book_code, chapter, verse, last_pos, last_pos + max_distance] + params
-            cursor.execute(search_sql, search_params)
-            
-            next_match = cursor.fetchone()
-            if next_match:
-                matched_words.append(next_match)
-                last_pos = next_match[4]  # word_position
-            else:
-                all_found = False
-                break
-        
-        # If all terms found, add to results
-        if all_found:
-            for match in matched_words:
-                results.append({
-                    'book_code': match[1],
-                    'chapter': match[2],
-                    'verse': match[3],
-                    'word': match[5],
-                    'lemma': match[6],
-                    'morph_code': match[7],
-                    'pos': match[8],
-                    'tense': match[9],
-                    'voice': match[10],
-                    'mood': match[11],
-                    'case': match[12],
-                    'number': match[13],
-                    'gender': match[14],
-                    'person': match[15],
-                })
+    # Each later term binds the distance (unless adjacent), then its own condition values
+    adjacent = max_distance == 1
+    for later_params in term_params[1:]:
+        if not adjacent:
+            params.append(max_distance)
+        params.extend(later_params)
+    
+    sql = _proximity_sql(first_conditions, tuple(term_conditions[1:]), adjacent)
+    
+    results = []
+    width = len(PROXIMITY_COLUMNS)
+    for row in conn.execute(sql, params):
+        for start in range(0, len(row), width):
+            results.append(dict(zip(RESULT_KEYS, row[start:start + width])))
     
     return results[:500]  # Limit results
 
@@ -5,7 +5,10 @@ Finds verses with similar vocabulary (lemmas) to a given source verse.
 
 import sqlite3
 import re
+import json
+import threading
 from typing import Dict, List, Tuple, Any
+from query_parser import book_key, BOOK_CODES as QUERY_BOOK_CODES
 
 # Part of speech weights for scoring
 POS_WEIGHTS = {
@@ -53,6 +56,12 @@ BOOK_ABBREVIATIONS = {
     'rev': '27', 'revelation': '27', 're': '27',
 }
 
+# Normalized lookup for verse references, accepting the advanced-search names too
+BOOK_CODES = {
+    **QUERY_BOOK_CODES,
+    **{book_key(abbrev): code for abbrev, code in BOOK_ABBREVIATIONS.items()},
+}
+
 
 def parse_verse_reference(ref: str) -> Tuple[str, int, int]:
     """
@@ -68,21 +77,44 @@ def parse_verse_reference(ref: str) -> Tuple[str, int, int]:
         raise ValueError(f"Invalid verse reference format: {ref}")
     
     book_str, chapter_str, verse_str = match.groups()
-    book_str = book_str.lower().replace(' ', '')
+    book_str = book_key(book_str)
     
     # Look up book code
-    book_code = BOOK_ABBREVIATIONS.get(book_str)
+    book_code = BOOK_CODES.get(book_str)
     if not book_code:
         raise ValueError(f"Unknown book: {book_str}")
     
     return book_code, int(chapter_str), int(verse_str)
 
 
+# Source-verse word lists by (book_code, chapter, verse). The text never changes
+# while the app runs, so re-searching the same verse (new corpora, selected
+# words) skips the query. Oldest entries are dropped past VERSE_WORDS_CACHE_SIZE.
+VERSE_WORDS_CACHE_SIZE = 2048
+_verse_words_cache: Dict[Tuple[str, int, int], Tuple[Tuple[str, str, int], ...]] = {}
+_verse_words_lock = threading.Lock()
+
+
 def get_verse_words(conn: sqlite3.Connection, book_code: str, chapter: int, verse: int) -> List[Dict[str, Any]]:
     """
     Get unique lemmas from a specific verse with their parts of speech.
     Returns list of dicts with keys: lemma, pos, weight (deduplicated by lemma)
     """
+    key = (book_code, chapter, verse)
+    words = _verse_words_cache.get(key)
+    if words is None:
+        words = _load_verse_words(conn, book_code, chapter, verse)
+        with _verse_words_lock:
+            if len(_verse_words_cache) >= VERSE_WORDS_CACHE_SIZE:
+                del _verse_words_cache[next(iter(_verse_words_cache))]
+            _verse_words_cache[key] = words
+    
+    # Fresh dicts so callers can't modify the cached entry
+    return [{'lemma': lemma, 'pos': pos, 'weight': weight} for lemma, pos, weight in words]
+
+
+def _load_verse_words(conn: sqlite3.Connection, book_code: str, chapter: int, verse: int) -> Tuple[Tuple[str, str, int], ...]:
+    """Query a verse's unique lemmas as (lemma, pos, weight) tuples, sorted for display."""
     cursor = conn.cursor()
     
     query = """
@@ -107,24 +139,11 @@ def get_verse_words(conn: sqlite3.Connection, book_code: str, chapter: int, vers
         weight = POS_WEIGHTS.get(pos, 1)
         
         # If lemma already exists, keep the higher weight
-        if lemma in lemma_dict:
-            if weight > lemma_dict[lemma]['weight']:
-                lemma_dict[lemma] = {
-                    'lemma': lemma,
-                    'pos': pos,
-                    'weight': weight
-                }
-        else:
-            lemma_dict[lemma] = {
-                'lemma': lemma,
-                'pos': pos,
-                'weight': weight
-            }
-    
-    # Convert to list and sort by weight (descending), then alphabetically
-    words = sorted(lemma_dict.values(), key=lambda x: (-x['weight'], x['lemma']))
+        if lemma not in lemma_dict or weight > lemma_dict[lemma][2]:
+            lemma_dict[lemma] = (lemma, pos, weight)
     
-    return words
+    # Sort by weight (descending), then alphabetically
+    return tuple(sorted(lemma_dict.values(), key=lambda x: (-x[2], x[0])))
 
 
 def search_by_lemmas(
@@ -134,11 +153,17 @@ def search_by_lemmas(
     source_chapter: int,
     source_verse: int,
     corpora: List[str] = None,
-    book_codes: List[str] = None
-) -> List[Dict[str, Any]]:
+    book_codes: List[str] = None,
+    limit: int = None
+) -> Tuple[List[Dict[str, Any]], int]:
     """
     Search for verses containing the given lemmas.
-    Returns results sorted by similarity score (descending).
+    Returns (results, total_matches): the top results sorted by similarity score
+    (descending), and the number of matching verses before the limit.
+    
+    Matching and scoring run in SQLite over the verse_lemmas table (one row per
+    distinct lemma in each verse, built by migrate_database), so only the
+    returned verses are read back into Python.
     
     Args:
         conn: Database connection
@@ -148,116 +173,111 @@ def search_by_lemmas(
         source_verse: Verse number of source verse
         corpora: List of corpora to search ('NT', 'LXX', or both)
         book_codes: Optional list of book codes to filter results (e.g., ['01', '06'])
+        limit: Optional maximum number of results to return
     """
     if not lemmas:
-        return []
+        return [], 0
     
     if corpora is None:
         corpora = ['NT']
     
-    cursor = conn.cursor()
-    
-    # Build a query that counts matches for each verse
-    # We'll use a subquery approach to score each verse
-    
-    # Create a list of lemmas to search for
-    lemma_list = [l['lemma'] for l in lemmas if l['lemma']]
-    if not lemma_list:
-        return []
-    
-    # Create a mapping of lemma -> weight
-    lemma_weights = {l['lemma']: l['weight'] for l in lemmas}
+    # Create a mapping of lemma -> weight for the lemmas to search for
+    lemma_weights = {l['lemma']: l['weight'] for l in lemmas if l['lemma']}
+    if not lemma_weights:
+        return [], 0
     
     # Build the query
-    placeholders = ','.join(['?' for _ in lemma_list])
     corpus_placeholders = ','.join(['?' for _ in corpora])
     
     # Add book filtering if specified
     book_filter = ""
     if book_codes:
         book_placeholders = ','.join(['?' for _ in book_codes])
-        book_filter = f"AND book_code IN ({book_placeholders})"
+        book_filter = f"AND vl.book_code IN ({book_placeholders})"
+    
+    # Databases that have not been migrated yet get the same rows from words,
+    # looked up through the lemma index for just the query lemmas
+    has_table = conn.execute(
+        "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'verse_lemmas'"
+    ).fetchone()
+    source = "verse_lemmas" if has_table else """(
+        SELECT DISTINCT w.lemma, w.corpus, w.book_code, w.chapter, w.verse
+        FROM query_lemmas ql CROSS JOIN words w ON w.lemma = ql.lemma
+    )"""
     
+    # Score = sum of the weights of the distinct lemmas a verse shares with the
+    # source; ties keep canonical verse order. The top verses are then joined
+    # back to words so their text comes back in the same statement, one row per
+    # word in result order.
     query = f"""
-        SELECT 
-            book_code,
-            chapter,
-            verse,
-            corpus
-        FROM words
-        WHERE lemma IN ({placeholders})
-        AND corpus IN ({corpus_placeholders})
-        {book_filter}
-        AND NOT (book_code = ? AND chapter = ? AND verse = ?)
-        GROUP BY book_code, chapter, verse, corpus
-        ORDER BY book_code, chapter, verse
+        WITH query_lemmas(lemma, weight) AS (SELECT key, value FROM json_each(?)),
+        top AS (
+            SELECT m.book_code, m.chapter, m.verse, m.corpus, m.score, m.match_count,
+                   b.book_name, COUNT(*) OVER () AS total
+            FROM (
+                SELECT vl.book_code, vl.chapter, vl.verse, vl.corpus,
+                       SUM(q.weight) AS score, COUNT(*) AS match_count
+                FROM query_lemmas q CROSS JOIN {source} vl ON vl.lemma = q.lemma
+                WHERE vl.corpus IN ({corpus_placeholders})
+                {book_filter}
+                AND NOT (vl.book_code = ? AND vl.chapter = ? AND vl.verse = ?)
+                GROUP BY vl.book_code, vl.chapter, vl.verse, vl.corpus
+            ) m
+            LEFT JOIN books b ON b.book_code = m.book_code AND b.corpus = m.corpus
+            ORDER BY m.score DESC, m.match_count DESC, m.book_code, m.chapter, m.verse
+            LIMIT ?
+        )
+        SELECT t.book_code, t.chapter, t.verse, t.corpus, t.score, t.match_count,
+               t.book_name, t.total, w.word, w.lemma
+        FROM top t CROSS JOIN words w
+            ON w.book_code = t.book_code AND w.chapter = t.chapter
+            AND w.verse = t.verse AND w.corpus = t.corpus
+        ORDER BY t.score DESC, t.match_count DESC, t.book_code, t.chapter, t.verse, w.word_position
     """
     
-    params = lemma_list + corpora
+    # The lemmas and weights go in as one JSON object parameter, so the statement
+    # has the same shape (and cached plan) and stays within SQLite's host
+    # parameter limit however many lemmas the source verse has
+    params = [json.dumps(lemma_weights, ensure_ascii=False)] + corpora
     if book_codes:
         params = params + book_codes
-    params = params + [source_book, source_chapter, source_verse]
-    cursor.execute(query, params)
-    rows = cursor.fetchall()
+    params = params + [source_book, source_chapter, source_verse, -1 if limit is None else limit]
     
-    # Score each result
+    # Group the word rows into results in one pass; each result's words and
+    # matched lemmas are collected in place and joined once all rows are read
     results = []
-    for row in rows:
-        book_code, chapter, verse, corpus = row
-        
-        # Use a separate cursor for each nested query
-        temp_cursor = conn.cursor()
-        
-        # Get all words with their lemmas from the verse
-        words_data = temp_cursor.execute(
-            "SELECT word, lemma FROM words WHERE book_code = ? AND chapter = ? AND verse = ? AND corpus = ? ORDER BY word_position",
-            (book_code, chapter, verse, corpus)
-        ).fetchall()
+    total_matches = 0
+    verse_key = None
+    for book_code, chapter, verse, corpus, score, match_count, book_name, total, word, lemma in conn.execute(query, params):
+        if (book_code, chapter, verse, corpus) != verse_key:
+            verse_key = (book_code, chapter, verse, corpus)
+            total_matches = total
+            verse_words = []
+            matched_lemmas = {}  # dict as an insertion-ordered set
+            results.append({
+                'book_code': book_code,
+                'book_name': book_name or f"Book {book_code}",  # Fallback if book not found
+                'chapter': chapter,
+                'verse': verse,
+                'corpus': corpus,
+                'score': score,
+                'match_count': match_count,
+                'verse_text': verse_words,
+                'matched_lemmas': matched_lemmas,
+            })
         
         # Build verse text with matching words in bold
-        verse_words = []
-        matched_lemmas = set()
-        for word, lemma in words_data:
-            if lemma in lemma_list:
-                # This word matches - wrap in <strong> tags
-                verse_words.append(f"<strong>{word}</strong>")
-                matched_lemmas.add(lemma)
-            else:
-                verse_words.append(word)
-        
-        verse_text = " ".join(verse_words)
-        
-        # Calculate score
-        score = sum(lemma_weights.get(lemma, 1) for lemma in matched_lemmas)
-        
-        # Get book name
-        book_name_result = temp_cursor.execute(
-            "SELECT book_name FROM books WHERE book_code = ? AND corpus = ? LIMIT 1",
-            (book_code, corpus)
-        ).fetchone()
-        
-        if not book_name_result:
-            # Fallback if book not found
-            book_name = f"Book {book_code}"
+        if lemma in lemma_weights:
+            verse_words.append(f"<strong>{word}</strong>")
+            matched_lemmas[lemma] = None
         else:
-            book_name = book_name_result[0]
-        
-        results.append({
-            'book_code': book_code,
-            'book_name': book_name,
-            'chapter': chapter,
-            'verse': verse,
-            'corpus': corpus,
-            'verse_text': verse_text.strip(),
-            'matched_lemmas': list(matched_lemmas),
-            'score': score,
-            'match_count': len(matched_lemmas)
-        })
+            verse_words.append(word)
     
-    # Sort by score (descending), then by match count
-    results.sort(key=lambda x: (x['score'], x['match_count']), reverse=True)
+    for result in results:
+        result['verse_text'] = " ".join(result['verse_text']).strip()
+        result['matched_lemmas'] = list(result['matched_lemmas'])
     
-    return results
+    return results, total_matches
 
 
 def get_verse_context(
@@ -270,11 +290,14 @@ def get_verse_context(
     """Get the full text of a verse."""
     cursor = conn.cursor()
     
+    # Ordered subquery so GROUP_CONCAT joins the words in verse order
     query = """
         SELECT GROUP_CONCAT(word, ' ')
-        FROM words
-        WHERE book_code = ? AND chapter = ? AND verse = ? AND corpus = ?
-        ORDER BY word_position
+        FROM (
+            SELECT word FROM words
+            WHERE book_code = ? AND chapter = ? AND verse = ? AND corpus = ?
+            ORDER BY word_position
+        )
     """
     
     cursor.execute(query, (book_code, chapter, verse, corpus))
@@ -3,15 +3,26 @@ Script to download MorphGNT data and set up the database for the Greek Bible Stu
 MorphGNT provides morphologically tagged Greek New Testament texts.
 """
 
+import functools
 import sqlite3
 import requests
 import os
 import re
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import closing
 from typing import List, Tuple
+from migrate_database import migrate, migrate_fts
 
 # MorphGNT GitHub repository - contains morphologically tagged Greek NT
 MORPHGNT_BASE_URL = "https://raw.githubusercontent.com/morphgnt/sblgnt/master/"
 
+# Books downloaded at once during setup (over one pooled HTTP session)
+DOWNLOAD_WORKERS = 8
+
+# Downloaded MorphGNT files are kept here, so rerunning setup reads them from
+# disk instead of fetching them again (delete the directory to re-download)
+MORPHGNT_CACHE_DIR = ".morphgnt_cache"
+
 # List of NT books (in order)
 # Format: (book_code, display_name, abbreviation, file_number, file_abbrev)
 # Note: file_number is used in the filename (61-Mt-morphgnt.txt), book_code is used in the data (01)
@@ -46,147 +57,208 @@ NT_BOOKS = [
 ]
 
 
-def parse_morphology(morph_code: str) -> dict:
+# MorphGNT morphology code letters -> readable values. Letters missing from a
+# map are stored as-is.
+POS_MAP = {
+    "N": "noun",
+    "V": "verb",
+    "A": "adjective",
+    "R": "pronoun",
+    "C": "conjunction",
+    "D": "adverb",
+    "P": "preposition",
+    "T": "article",
+    "I": "interjection",
+    "X": "particle",
+}
+PERSON_MAP = {"1": "1st", "2": "2nd", "3": "3rd"}
+TENSE_MAP = {"P": "present", "I": "imperfect", "F": "future",
+             "A": "aorist", "X": "perfect", "Y": "pluperfect"}
+VOICE_MAP = {"A": "active", "M": "middle", "P": "passive"}
+MOOD_MAP = {"I": "indicative", "D": "imperative", "S": "subjunctive",
+            "O": "optative", "N": "infinitive", "P": "participle"}
+CASE_MAP = {"N": "nominative", "G": "genitive", "D": "dative", "A": "accusative", "V": "vocative"}
+GENDER_MAP = {"M": "masculine", "F": "feminine", "N": "neuter"}
+
+# A word line starts with the fixed-width reference, POS and morphology fields
+# ("010101 N- ----GSF-"), so no shorter line can hold a MorphGNT word
+MIN_WORD_LINE_LENGTH = 18
+
+# Chapter and verse fields of a reference are always two zero-padded digits,
+# so they are looked up here rather than parsed with int() for every word
+TWO_DIGIT_NUMBERS = {b"%02d" % i: i for i in range(100)}
+
+# parse_morphology result for a missing or too-short code
+EMPTY_MORPHOLOGY = (None,) * 8
+
+# Insert for one words row, in the column order morphgnt_rows yields. Every
+# book goes through the same cursor with this same string, so sqlite3 prepares
+# it once and reuses the statement from its cache for the rest of the load.
+# The word arrives as raw UTF-8 bytes, which sqlite3 binds as a blob; the CAST
+# stores it as text in SQLite itself, with no decode in Python.
+INSERT_WORD_SQL = """
+    INSERT INTO words (
+        book_code, chapter, verse, word_position, word, lemma, morph_code,
+        pos, person, tense, voice, mood, case_value, number, gender, corpus
+    ) VALUES (?, ?, ?, ?, CAST(? AS TEXT), ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+"""
+
+
+@functools.lru_cache(maxsize=None)
+def parse_morphology(morph_code: str) -> tuple:
     """
     Parse MorphGNT morphology codes into readable components.
     Format: Combined POS (2 chars) + morphology (8 chars) = 10 chars total
     Example: "N-----NSF-" or "V-3AAI-S--"
+    Returns (pos, person, tense, voice, mood, case, number, gender), with None
+    for anything the code does not specify.
+    
+    The NT uses only about a thousand distinct codes, so results are cached
+    and each one is decoded once per setup run.
     """
     if not morph_code or len(morph_code) < 2:
-        return {}
+        return EMPTY_MORPHOLOGY
     
-    parts = {}
+    person = tense = voice = mood = case = number = gender = None
     
     # First character is part of speech
-    pos_map = {
-        "N": "noun",
-        "V": "verb",
-        "A": "adjective",
-        "R": "pronoun",
-        "C": "conjunction",
-        "D": "adverb",
-        "P": "preposition",
-        "T": "article",
-        "I": "interjection",
-        "X": "particle",
-    }
+    pos = POS_MAP.get(morph_code[0], morph_code[0])
     
-    parts["pos"] = pos_map.get(morph_code[0], morph_code[0])
+    # Both parsed layouts are at least 8 characters, so one slice gives the
+    # fixed-width fields instead of a length check per position (gender, at
+    # position 8, may be missing)
+    if len(morph_code) < 8:
+        return pos, person, tense, voice, mood, case, number, gender
+    person_code, tense_code, voice_code, mood_code, case_code, number_code = morph_code[2:8]
+    gender_code = morph_code[8:9] or "-"
     
-    # For verbs: V-3AAI-S--
-    # Position 2: person (1,2,3)
-    # Position 3: tense (P,I,F,A,X,Y)
-    # Position 4: voice (A,M,P)
-    # Position 5: mood (I,D,S,O,N,P)
-    # Position 7: number (S,P)
-    # Position 8: gender (M,F,N)
-    if morph_code[0] == "V" and len(morph_code) >= 8:
-        # Person
-        if len(morph_code) > 2 and morph_code[2] != "-":
-            parts["person"] = morph_code[2] + "rd" if morph_code[2] == "3" else morph_code[2] + ("st" if morph_code[2] == "1" else "nd")
-        # Tense
-        tense_map = {"P": "present", "I": "imperfect", "F": "future", 
-                     "A": "aorist", "X": "perfect", "Y": "pluperfect"}
-        if len(morph_code) > 3 and morph_code[3] != "-":
-            parts["tense"] = tense_map.get(morph_code[3], morph_code[3])
-        # Voice
-        voice_map = {"A": "active", "M": "middle", "P": "passive"}
-        if len(morph_code) > 4 and morph_code[4] != "-":
-            parts["voice"] = voice_map.get(morph_code[4], morph_code[4])
-        # Mood
-        mood_map = {"I": "indicative", "D": "imperative", "S": "subjunctive", 
-                    "O": "optative", "N": "infinitive", "P": "participle"}
-        if len(morph_code) > 5 and morph_code[5] != "-":
-            parts["mood"] = mood_map.get(morph_code[5], morph_code[5])
-        # Case (position 6, for participles)
-        case_map = {"N": "nominative", "G": "genitive", "D": "dative", "A": "accusative", "V": "vocative"}
-        if len(morph_code) > 6 and morph_code[6] != "-":
-            parts["case"] = case_map.get(morph_code[6], morph_code[6])
-        # Number
-        if len(morph_code) > 7 and morph_code[7] != "-":
-            parts["number"] = "singular" if morph_code[7] == "S" else "plural"
-        # Gender
-        if len(morph_code) > 8 and morph_code[8] != "-":
-            gender_map = {"M": "masculine", "F": "feminine", "N": "neuter"}
-            parts["gender"] = gender_map.get(morph_code[8], morph_code[8])
-    
-    # For nouns, adjectives, pronouns, articles: N-----NSF-
-    # Position 6: case (N,G,D,A,V)
-    # Position 7: number (S,P)
-    # Position 8: gender (M,F,N)
-    elif morph_code[0] in ["N", "A", "R", "T"] and len(morph_code) >= 8:
-        # Case
-        case_map = {"N": "nominative", "G": "genitive", "D": "dative", "A": "accusative", "V": "vocative"}
-        if len(morph_code) > 6 and morph_code[6] != "-":
-            parts["case"] = case_map.get(morph_code[6], morph_code[6])
-        # Number
-        if len(morph_code) > 7 and morph_code[7] != "-":
-            parts["number"] = "singular" if morph_code[7] == "S" else "plural"
-        # Gender
-        if len(morph_code) > 8 and morph_code[8] != "-":
-            gender_map = {"M": "masculine", "F": "feminine", "N": "neuter"}
-            parts["gender"] = gender_map.get(morph_code[8], morph_code[8])
+    # Verbs, nouns, adjectives, pronouns and articles all carry
+    # position 6: case (N,G,D,A,V; for verbs, participles only)
+    # position 7: number (S,P)
+    # position 8: gender (M,F,N)
+    # e.g. N-----NSF-, V-3AAI-S--
+    if morph_code[0] in "VNART":
+        if case_code != "-":
+            case = CASE_MAP.get(case_code, case_code)
+        if number_code != "-":
+            number = "singular" if number_code == "S" else "plural"
+        if gender_code != "-":
+            gender = GENDER_MAP.get(gender_code, gender_code)
+        
+        # Verbs also carry
+        # position 2: person (1,2,3)
+        # position 3: tense (P,I,F,A,X,Y)
+        # position 4: voice (A,M,P)
+        # position 5: mood (I,D,S,O,N,P)
+        if morph_code[0] == "V":
+            if person_code != "-":
+                person = PERSON_MAP.get(person_code, person_code + "nd")
+            if tense_code != "-":
+                tense = TENSE_MAP.get(tense_code, tense_code)
+            if voice_code != "-":
+                voice = VOICE_MAP.get(voice_code, voice_code)
+            if mood_code != "-":
+                mood = MOOD_MAP.get(mood_code, mood_code)
     
-    return parts
+    return pos, person, tense, voice, mood, case, number, gender
 
 
-def download_morphgnt_file(book_name: str, file_number: str, file_abbrev: str) -> List[str]:
-    """Download a MorphGNT file for a specific book."""
-    url = f"{MORPHGNT_BASE_URL}{file_number}-{file_abbrev}-morphgnt.txt"
+def download_morphgnt_file(session: requests.Session, book_name: str, file_number: str,
+                           file_abbrev: str) -> List[bytes]:
+    """
+    Download a MorphGNT file for a specific book and return its lines as
+    undecoded UTF-8 bytes. The body is streamed and split into lines as it
+    arrives, rather than decoded into one string and split afterwards. Files
+    already in MORPHGNT_CACHE_DIR are read from there instead.
+    """
+    file_name = f"{file_number}-{file_abbrev}-morphgnt.txt"
+    cache_path = os.path.join(MORPHGNT_CACHE_DIR, file_name)
+    if os.path.exists(cache_path):
+        with open(cache_path, "rb") as f:
+            lines = f.read().splitlines()
+        print(f"  [OK] Using cached {book_name}")
+        return lines
+    
+    url = f"{MORPHGNT_BASE_URL}{file_name}"
     print(f"Downloading {book_name}...")
     
     try:
-        response = requests.get(url, timeout=10)
-        response.raise_for_status()
+        with session.get(url, timeout=10, stream=True) as response:
+            response.raise_for_status()
+            lines = list(response.iter_lines())
         print(f"  [OK] Successfully downloaded {book_name}")
-        return response.text.strip().split("\n")
     except Exception as e:
         print(f"  [ERROR] Error downloading {book_name}: {e}")
         return []
+    
+    # Write to a temporary name first, so an interrupted run never leaves a
+    # partial file in the cache
+    try:
+        os.makedirs(MORPHGNT_CACHE_DIR, exist_ok=True)
+        temp_path = f"{cache_path}.tmp"
+        with open(temp_path, "wb") as f:
+            f.write(b"\n".join(lines))
+        os.replace(temp_path, cache_path)
+    except OSError as e:
+        print(f"  [WARN] Could not cache {book_name}: {e}")
+    return lines
 
 
-def parse_morphgnt_line(line: str) -> dict:
+@functools.lru_cache(maxsize=None)
+def decode_field(field: bytes) -> str:
+    """
+    Decode a repeating MorphGNT field (book code, lemma, morphology code).
+    Each distinct value is decoded once, and every row shares the same str.
+    """
+    return field.decode("utf-8")
+
+
+def parse_morphgnt_line(line: bytes) -> tuple:
     """
     Parse a single line from MorphGNT format.
     Format: REFERENCE POS MORPH WORD NORMALIZED VARIANT LEMMA
     Example: 010101 N- ----GSF- γενέσεως γενέσεως γενέσεως γένεσις
     The lemma (dictionary form) is in position 6.
+    Returns a words row: (book_code, chapter, verse, word_position, word, lemma,
+    morph_code, pos, person, tense, voice, mood, case, number, gender, corpus),
+    or None if the line is too short. The word is left as UTF-8 bytes for
+    INSERT_WORD_SQL to store as text.
     """
-    parts = line.strip().split()
+    parts = line.split()  # split() with no separator also strips the line
     if len(parts) < 7:  # Need at least 7 parts for lemma
         return None
     
-    ref = parts[0]
-    book = ref[:2]
-    chapter = int(ref[2:4])
-    verse = int(ref[4:6])
-    word_pos = int(ref[6:]) if len(ref) > 6 else 1
-    
-    pos_code = parts[1] if len(parts) > 1 else ""
-    morph_code = parts[2] if len(parts) > 2 else ""
-    word = parts[3] if len(parts) > 3 else ""
-    lemma = parts[6] if len(parts) > 6 else ""  # Fixed: lemma is at position 6
+    # Every field is present once there are 7 parts, so unpack them in one go
+    ref, pos_code, morph_code, word, _, _, lemma = parts[:7]  # lemma is at position 6
+    book = decode_field(ref[:2])
+    chapter = TWO_DIGIT_NUMBERS[ref[2:4]]
+    verse = TWO_DIGIT_NUMBERS[ref[4:6]]
+    # SBLGNT references are BBCCVV with no word index, so word_position is a
+    # placeholder 1 here; morphgnt_rows numbers the words of each verse itself
     
-    # Combine pos and morph codes
-    full_morph = pos_code + morph_code
-    parsed_morph = parse_morphology(full_morph)
+    # Combine pos and morph codes. The lemma and code repeat across thousands
+    # of words, so they go through decode_field's cache
+    full_morph = decode_field(pos_code + morph_code)
+    lemma = decode_field(lemma)
     
-    return {
-        "book_code": book,
-        "chapter": chapter,
-        "verse": verse,
-        "word_position": word_pos,
-        "word": word,
-        "lemma": lemma,
-        "morph_code": full_morph,
-        "parsed_morph": parsed_morph,
-    }
+    # Laid out in the order of the words INSERT in populate_database
+    return (book, chapter, verse, 1, word, lemma, full_morph,
+            *parse_morphology(full_morph), 'NT')
 
 
 def create_database():
-    """Create the SQLite database schema."""
-    conn = sqlite3.connect("greek_nt.db")
+    """Create the SQLite database tables (indexes are added by create_indexes_and_fts)."""
+    # Tuned for the one-off bulk load that follows: a crash mid-setup just
+    # means running setup again, so commits skip fsync
+    conn = sqlite3.connect("greek_nt.db", isolation_level=None)
     cursor = conn.cursor()
+    cursor.executescript("""
+        PRAGMA journal_mode=WAL;
+        PRAGMA synchronous=OFF;
+        PRAGMA temp_store=memory;
+        PRAGMA cache_size=-200000;
+        PRAGMA locking_mode=EXCLUSIVE;
+    """)
     
     # Books table
     cursor.execute("""
@@ -198,10 +270,12 @@ def create_database():
         )
     """)
     
-    # Words table with full morphological data
+    # Words table with full morphological data. id is a plain rowid alias (no
+    # AUTOINCREMENT bookkeeping); words are inserted in canonical order, so ids
+    # follow (book_code, chapter, verse, word_position) and the table only appends
     cursor.execute("""
         CREATE TABLE IF NOT EXISTS words (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            id INTEGER PRIMARY KEY,
             book_code TEXT NOT NULL,
             chapter INTEGER NOT NULL,
             verse INTEGER NOT NULL,
@@ -223,100 +297,91 @@ def create_database():
         )
     """)
     
-    # Create indexes for efficient querying
+    conn.commit()
+    return conn
+
+
+def create_indexes_and_fts(conn):
+    """
+    Create the secondary indexes and the full-text index on words. Run after
+    populate_database, so each index is built in one pass over the loaded rows
+    instead of being updated for every insert.
+    """
+    cursor = conn.cursor()
+    
+    # Verse lookups. Lemma, morphology and corpus get no single-column indexes
+    # of their own: searches on them go through the composite indexes
+    # migrate() adds (idx_words_lemma_corpus, idx_words_morph)
     cursor.execute("CREATE INDEX IF NOT EXISTS idx_book_chapter_verse ON words(book_code, chapter, verse)")
-    cursor.execute("CREATE INDEX IF NOT EXISTS idx_lemma ON words(lemma)")
-    cursor.execute("CREATE INDEX IF NOT EXISTS idx_pos ON words(pos)")
-    cursor.execute("CREATE INDEX IF NOT EXISTS idx_tense ON words(tense)")
-    cursor.execute("CREATE INDEX IF NOT EXISTS idx_voice ON words(voice)")
-    cursor.execute("CREATE INDEX IF NOT EXISTS idx_mood ON words(mood)")
-    cursor.execute("CREATE INDEX IF NOT EXISTS idx_case ON words(case_value)")
-    cursor.execute("CREATE INDEX IF NOT EXISTS idx_number ON words(number)")
-    cursor.execute("CREATE INDEX IF NOT EXISTS idx_gender ON words(gender)")
-    cursor.execute("CREATE INDEX IF NOT EXISTS idx_corpus ON words(corpus)")
     
-    # Full-text search virtual table
-    cursor.execute("""
-        CREATE VIRTUAL TABLE IF NOT EXISTS words_fts USING fts5(
-            word, lemma, content=words, content_rowid=id
-        )
-    """)
+    # Full-text search virtual table (trigram, for substring text search),
+    # filled from words with FTS5's bulk 'rebuild' command
+    migrate_fts(conn, rebuild=True)
     
     conn.commit()
-    return conn
+
+
+def morphgnt_rows(lines):
+    """
+    Yield a words row for each word line of a MorphGNT file, numbering the
+    words within each verse.
+    """
+    current_verse = None
+    verse_word_pos = 0
+    
+    for line in lines:
+        # Blank and stray short lines are dropped on length alone, without
+        # stripping them or calling parse_morphgnt_line
+        if len(line) < MIN_WORD_LINE_LENGTH:
+            continue
+        
+        row = parse_morphgnt_line(line)
+        if row:
+            # Track word position within verse
+            verse_key = row[:3]
+            if verse_key != current_verse:
+                current_verse = verse_key
+                verse_word_pos = 1
+            else:
+                verse_word_pos += 1
+            
+            # Use tracked position instead of parsed position
+            yield verse_key + (verse_word_pos,) + row[4:]
 
 
 def populate_database(conn):
     """Download MorphGNT data and populate the database."""
     cursor = conn.cursor()
     
-    # Insert books
-    for book_code, book_name, book_abbrev, file_number, file_abbrev in NT_BOOKS:
-        cursor.execute(
-            "INSERT OR REPLACE INTO books (book_code, book_name, book_abbrev, corpus) VALUES (?, ?, ?, ?)",
-            (book_code, book_name, book_abbrev, 'NT')
-        )
-    
-    conn.commit()
+    # The connection is in autocommit mode, so the whole load is wrapped in
+    # one explicit transaction, committed once at the end
+    cursor.execute("BEGIN")
     
     # Download and parse each book
     word_count = 0
-    for book_code, book_name, book_abbrev, file_number, file_abbrev in NT_BOOKS:
-        lines = download_morphgnt_file(book_name, file_number, file_abbrev)
+    with requests.Session() as session, ThreadPoolExecutor(DOWNLOAD_WORKERS) as executor:
+        # Room in the session's pool for one kept-alive connection per download thread
+        session.mount("https://", requests.adapters.HTTPAdapter(pool_maxsize=DOWNLOAD_WORKERS))
         
-        # Track word position within each verse
-        current_verse = None
-        verse_word_pos = 0
+        # One pass over NT_BOOKS inserts each book row and starts its download;
+        # books are still parsed and inserted in order below
+        downloads = []
+        for book_code, book_name, book_abbrev, file_number, file_abbrev in NT_BOOKS:
+            cursor.execute(
+                "INSERT OR REPLACE INTO books (book_code, book_name, book_abbrev, corpus) VALUES (?, ?, ?, ?)",
+                (book_code, book_name, book_abbrev, 'NT')
+            )
+            downloads.append(
+                (book_name, executor.submit(download_morphgnt_file, session, book_name, file_number, file_abbrev))
+            )
         
-        for line in lines:
-            if not line.strip():
-                continue
+        for book_name, download in downloads:
+            lines = download.result()
             
-            data = parse_morphgnt_line(line)
-            if data:
-                # Track word position within verse
-                verse_key = (data["book_code"], data["chapter"], data["verse"])
-                if verse_key != current_verse:
-                    current_verse = verse_key
-                    verse_word_pos = 1
-                else:
-                    verse_word_pos += 1
-                
-                parsed = data["parsed_morph"]
-                cursor.execute("""
-                    INSERT INTO words (
-                        book_code, chapter, verse, word_position, word, lemma, morph_code,
-                        pos, person, tense, voice, mood, case_value, number, gender, corpus
-                    ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-                """, (
-                    data["book_code"],
-                    data["chapter"],
-                    data["verse"],
-                    verse_word_pos,  # Use tracked position instead of parsed position
-                    data["word"],
-                    data["lemma"],
-                    data["morph_code"],
-                    parsed.get("pos"),
-                    parsed.get("person"),
-                    parsed.get("tense"),
-                    parsed.get("voice"),
-                    parsed.get("mood"),
-                    parsed.get("case"),
-                    parsed.get("number"),
-                    parsed.get("gender"),
-                    'NT',  # Corpus identifier
-                ))
-                word_count += 1
-        
-        conn.commit()
-        print(f"  [OK] {book_name} completed ({word_count} total words)")
-    
-    # Populate FTS table
-    print("\nBuilding full-text search index...")
-    cursor.execute("""
-        INSERT INTO words_fts (rowid, word, lemma)
-        SELECT id, word, lemma FROM words
-    """)
+            # executemany pulls the rows straight from the generator, one book per call
+            cursor.executemany(INSERT_WORD_SQL, morphgnt_rows(lines))
+            word_count += cursor.rowcount
+            print(f"  [OK] {book_name} completed ({word_count} total words)")
     
     conn.commit()
     print(f"[OK] Database populated with {word_count} words!")
@@ -345,6 +410,12 @@ def main():
     print("(This may take a few minutes)")
     print()
     populate_database(conn)
+    print()
+    
+    print("Creating indexes and full-text search index...")
+    create_indexes_and_fts(conn)
+    migrate(conn)
+    print("[OK] Indexes created")
     
     conn.close()
     print()
@@ -358,10 +429,9 @@ def main():
     lexicon_text = download_lexemes()
     if lexicon_text:
         entries = parse_lexemes_yaml(lexicon_text)
-        conn2 = sqlite3.connect("greek_nt.db")
-        create_lexicon_table(conn2)
-        count = populate_lexicon(conn2, entries)
-        conn2.close()
+        with closing(sqlite3.connect("greek_nt.db")) as conn2:
+            create_lexicon_table(conn2)
+            count = populate_lexicon(conn2, entries)
         print(f"[OK] Imported {count:,} lexicon glosses")
     else:
         print("[WARN] Could not download lexicon — run 'python import_lexicon.py' later.")